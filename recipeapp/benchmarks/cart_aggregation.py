@@ -0,0 +1,99 @@
+"""
+Benchmark of shopping cart aggregation backends
+
+Builds a synthetic database, selects recipes adding up to ``--rows``
+recipe ingredient rows and times the cart computed inside SQLite against
+fetching the rows and aggregating them with NumPy or pint. Pint can't add
+mass to volume, so each ingredient is measured in only one of them. Every
+backend must produce the same shopping list, give or take the last printed
+digit: backends add up the same numbers in a different order, which can tip
+a total sitting on a rounding boundary either way.
+
+    PYTHONPATH=src python benchmarks/cart_aggregation.py --rows 100000
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from recipeapp.cart import aggregate_rows, build_cart, get_numpy
+from synthetic import INGREDIENTS_PER_RECIPE, make_database
+
+def same_cart(a, b):
+    """
+    Whether two shopping lists match, quantities within 0.01.
+    """
+    if [x["ingredient"] for x in a] != [x["ingredient"] for x in b]:
+        return False
+
+    for x, y in zip(a, b):
+        x_numbers = re.findall(r"[\d.]+", x["quantity"])
+        y_numbers = re.findall(r"[\d.]+", y["quantity"])
+        if re.sub(r"[\d.]+", "", x["quantity"]) != re.sub(r"[\d.]+", "", y["quantity"]):
+            return False
+        if any(abs(float(i) - float(j)) > 0.0101 for i, j in zip(x_numbers, y_numbers)):
+            return False
+
+    return True
+
+
+def best_of(repeat, call):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        times.append(time.perf_counter() - start)
+
+    return min(times), result
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000,
+                        help="Recipe ingredient rows in the cart")
+    parser.add_argument("--ingredients", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    recipes = max(1, args.rows // INGREDIENTS_PER_RECIPE)
+    names = ["recipe %d" % i for i in range(recipes)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        helper = make_database(
+            os.path.join(tmp_dir, "recipe.db"), recipes, args.ingredients,
+            single_dimension=True
+        )
+
+        backends = {"sqlite": lambda: build_cart(helper, names)}
+        if get_numpy() is not None:
+            backends["numpy"] = lambda: aggregate_rows(
+                helper.get_cart_rows(names), backend="numpy"
+            )
+        try:
+            from recipeapp.units import get_pint_units
+            units = get_pint_units()
+            backends["python"] = lambda: aggregate_rows(
+                helper.get_cart_rows(names), units, backend="python"
+            )
+        except ImportError:
+            pass
+
+        results = {}
+        print(f"cart rows: {recipes * INGREDIENTS_PER_RECIPE} from {recipes} recipes")
+        for name, call in backends.items():
+            elapsed, results[name] = best_of(args.repeat, call)
+            print(f"{name:8}{elapsed * 1000:10.1f} ms")
+
+        helper.conn.close()
+
+    reference = results.pop("sqlite")
+    for name, result in results.items():
+        if not same_cart(result, reference):
+            raise SystemExit(f"{name} shopping list differs from sqlite")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark of catalog export and import
+
+Builds a synthetic database, exports it to a catalog, imports the catalog
+into a fresh database and reports times and sizes against the SQLite file.
+
+    PYTHONPATH=src python benchmarks/catalog_transfer.py --recipes 100000
+"""
+
+import argparse
+import os
+import tempfile
+
+from recipeapp.catalog import export_catalog, import_catalog
+from synthetic import make_database
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--recipes", type=int, default=100000)
+    parser.add_argument("--ingredients", type=int, default=2000)
+    parser.add_argument("--instructions", type=int, default=400,
+                        help="Length of every recipe's instructions")
+    args = parser.parse_args(argv)
+
+    instructions = ("Chop, stir and simmer. " * args.instructions)[:args.instructions]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "recipe.db")
+        catalog_path = os.path.join(tmp_dir, "recipes.rcat")
+
+        make_database(db_path, args.recipes, args.ingredients, instructions or None).conn.close()
+        exported = export_catalog(db_path, catalog_path)
+        imported = import_catalog(catalog_path, os.path.join(tmp_dir, "imported.db"))
+
+        db_size = os.path.getsize(db_path)
+
+    print(f"recipes:      {exported['recipes']} ({exported['rows']} recipe ingredients)")
+    print(f"sqlite file:  {db_size / 2 ** 20:.1f} MiB")
+    print(f"catalog file: {exported['bytes'] / 2 ** 20:.1f} MiB "
+          f"({db_size / exported['bytes']:.1f}x smaller)")
+    print(f"export:       {exported['elapsed']:.2f} s")
+    print(f"import:       {imported['elapsed']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
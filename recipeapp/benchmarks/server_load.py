@@ -0,0 +1,170 @@
+"""
+Load test for the recipe HTTP API server
+
+Starts ``python -m recipeapp.server`` on a copy of the database (or targets
+a running server with ``--url``), hammers it from many concurrent
+keep-alive clients and reports requests/sec with latency percentiles.
+Clients also save and delete recipes, so the latencies include writes and
+the reads queued behind them.
+
+    PYTHONPATH=src python benchmarks/server_load.py --clients 200 --duration 10
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+DEFAULT_DB = Path(__file__).parent.parent / "src" / "recipeapp" / "resources" / "recipe.db"
+
+# Ingredients of the recipes clients save
+WRITE_INGREDIENTS = [
+    {"name": "onion", "quantity": 1, "unit": ""},
+    {"name": "garlic", "quantity": 2, "unit": ""},
+    {"name": "tomato", "quantity": 14, "unit": "oz"},
+]
+
+
+def start_server(db_path, readers):
+    """
+    Run the server on a free port.
+
+    :return: Server process and base url
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "recipeapp.server", "--db", db_path,
+         "--port", "0", "--readers", str(readers)],
+        stdout=subprocess.PIPE,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    url = process.stdout.readline().split()[-1]
+
+    return process, url
+
+
+def make_requests(url):
+    """
+    A mix of the endpoints, weighted towards reads like the apps using it.
+    """
+    connection = http.client.HTTPConnection(urlsplit(url).netloc)
+    connection.request("GET", "/recipes?limit=1000")
+    recipes = json.load(connection.getresponse())["recipes"]
+    connection.close()
+
+    requests = [("GET", "/recipes", None), ("GET", "/recipes?prefix=p", None)]
+    requests += [("GET", f"/recipes/{quote(x)}", None) for x in recipes[:20]]
+    requests += [("GET", f"/ingredients?q={q}", None) for q in ["on", "pe", "ch", "to"]]
+    requests += [("GET", "/pantry?ingredients=onion,garlic,tomato", None)] * 4
+    requests += [
+        ("POST", "/cart", json.dumps({"recipes": random.sample(recipes, min(5, len(recipes)))}))
+        for _ in range(10)
+    ]
+    # Saving a new recipe and deleting one saved before, filled in by client
+    requests += [("POST", "/recipes", None), ("DELETE", "/recipes", None)] * 2
+
+    return requests
+
+
+def client(url, requests, deadline, latencies, errors, write_latencies):
+    connection = http.client.HTTPConnection(urlsplit(url).netloc, timeout=30)
+    saved = []
+
+    while time.perf_counter() < deadline:
+        method, path, body = random.choice(requests)
+        write = path == "/recipes" and method != "GET"
+        if write and method == "POST":
+            name = "load test {0} {1}".format(threading.get_ident(), len(latencies))
+            body = json.dumps({"name": name, "ingredients": WRITE_INGREDIENTS})
+            saved.append(name)
+        elif write:
+            if not saved:
+                continue
+            path = "/recipes/" + quote(saved.pop())
+        start = time.perf_counter()
+        try:
+            connection.request(method, path, body=body,
+                               headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(repr(e))
+            connection.close()
+            connection = http.client.HTTPConnection(urlsplit(url).netloc, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+        if write:
+            write_latencies.append(latencies[-1])
+
+    connection.close()
+
+
+def percentile(values, p):
+
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="Target a running server instead of starting one")
+    parser.add_argument("--db", default=str(DEFAULT_DB), help="Database to copy and serve")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args(argv)
+
+    process = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = args.url
+        if url is None:
+            db_path = os.path.join(tmp_dir, "recipe.db")
+            shutil.copyfile(args.db, db_path)
+            process, url = start_server(db_path, args.readers)
+
+        try:
+            requests = make_requests(url)
+            latencies, errors, write_latencies = [], [], []
+            deadline = time.perf_counter() + args.duration
+            threads = [
+                threading.Thread(target=client, args=(
+                    url, requests, deadline, latencies, errors, write_latencies
+                ))
+                for _ in range(args.clients)
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    latencies.sort()
+    write_latencies.sort()
+    print(f"clients:      {args.clients}")
+    print(f"requests:     {len(latencies)} ({len(errors)} errors, {len(write_latencies)} writes)")
+    print(f"requests/sec: {len(latencies) / elapsed:.0f}")
+    if latencies:
+        print(f"p50 latency:  {percentile(latencies, 50) * 1000:.1f} ms")
+        print(f"p99 latency:  {percentile(latencies, 99) * 1000:.1f} ms")
+    if write_latencies:
+        print(f"write p99:    {percentile(write_latencies, 99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
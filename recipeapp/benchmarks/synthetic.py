@@ -0,0 +1,51 @@
+"""
+Synthetic recipe databases for the benchmarks
+"""
+
+import random
+
+from recipeapp.db.sqlite_helper.SQLiteHelper import SQLiteHelper
+from recipeapp.units import DIMENSIONS, UNITS
+
+INGREDIENTS_PER_RECIPE = 8
+
+
+def make_database(db_path, recipes, ingredients, instructions=None, seed=0,
+                  single_dimension=False):
+    """
+    Fill a new database with random recipes.
+
+    :param db_path: Path of the database created
+    :param recipes: Number of recipes, named ``recipe <n>``
+    :param ingredients: Number of ingredients, named ``ingredient <n>``
+    :param instructions: Instructions of every recipe, none if unset
+    :param seed: Random seed
+    :param single_dimension: Measure every ingredient either by volume or
+        by mass, besides counting it, rather than with any unit
+    :return: Helper over the database
+    """
+    rng = random.Random(seed)
+    units = [list(UNITS)] * ingredients
+    if single_dimension:
+        measured = DIMENSIONS[1:]
+        units = [
+            [u for u, (_, dimension, _) in UNITS.items()
+             if dimension in ("count", measured[x % len(measured)])]
+            for x in range(ingredients)
+        ]
+
+    helper = SQLiteHelper(db_path)
+    helper.conn.executemany(
+        "INSERT INTO ingredient (name) VALUES (?)",
+        [("ingredient %d" % i,) for i in range(ingredients)]
+    )
+    helper.conn.commit()
+    helper.add_recipes([
+        {"name": "recipe %d" % i, "ingredients": [
+            {"name": "ingredient %d" % x, "quantity": rng.randint(1, 16), "unit": rng.choice(units[x])}
+            for x in rng.sample(range(ingredients), INGREDIENTS_PER_RECIPE)
+        ], "instructions": instructions}
+        for i in range(recipes)
+    ])
+
+    return helper
@@ -0,0 +1,209 @@
+"""
+UI event latency benchmark for RecipeApp
+
+Boots ``RecipeApp`` headless on Toga's dummy backend against a synthetic
+database, scripts event storms through the widgets (typing in the search
+boxes, adding recipes, populating the cart, navigating back and forth) and
+reports p50/p99 latency per event handler, widget updates included.
+
+    PYTHONPATH=src python benchmarks/ui_latency.py --recipes 20000
+
+With ``--max-p99`` it exits with an error when a handler is slower, so it
+can gate CI.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("TOGA_BACKEND", "toga_dummy")
+
+from recipeapp.app import MORE_RECIPES, RecipeApp  # noqa: E402
+from synthetic import make_database  # noqa: E402
+
+HANDLERS = [
+    "update_recipe_selection",
+    "add_recipe_to_table",
+    "populate_cart",
+    "save_selections",
+    "show_add_recipe_box",
+    "show_main_box",
+    "update_ingredients_list",
+    "add_ingredient",
+    "save_recipe",
+]
+
+def timed(name):
+    """
+    Wrap a RecipeApp handler to record how long each call takes.
+    """
+    handler = getattr(RecipeApp, name)
+
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return handler(self, *args, **kwargs)
+        finally:
+            self.latencies[name].append(time.perf_counter() - start)
+
+    wrapper.__name__ = name
+
+    return wrapper
+
+
+class HarnessApp(RecipeApp):
+    """
+    RecipeApp reading its database and selections from ``data_dir`` and
+    timing its event handlers.
+    """
+
+    def __init__(self, data_dir, *args, **kwargs):
+        self.data_dir = Path(data_dir)
+        self.latencies = defaultdict(list)
+        super().__init__(*args, **kwargs)
+
+    @property
+    def paths(self):
+
+        return SimpleNamespace(
+            app=Path(sys.modules[RecipeApp.__module__].__file__).parent,
+            data=self.data_dir
+        )
+
+
+for name in HANDLERS:
+    setattr(HarnessApp, name, timed(name))
+
+
+def dismiss_dialogs(app):
+    # The dummy backend needs an answer ready for every dialog shown
+    app.main_window._impl.dialog_responses = {"InfoDialog": [None] * 10000}
+
+
+def find_widget(widget, placeholder):
+
+    if getattr(widget, "placeholder", None) == placeholder:
+        return widget
+    for child in widget.children:
+        found = find_widget(child, placeholder)
+        if found is not None:
+            return found
+
+
+def type_text(text_input, text):
+    """
+    Type ``text`` one character at a time, then delete it the same way.
+    """
+    for i in range(1, len(text) + 1):
+        text_input.value = text[:i]
+    for i in range(len(text) - 1, -1, -1):
+        text_input.value = text[:i]
+
+
+def run_storms(app, rounds=100, seed=0):
+    """
+    Drive the app through the scripted event storms.
+    """
+    rng = random.Random(seed)
+    dismiss_dialogs(app)
+
+    # Rapid typing in the search boxes
+    for _ in range(max(1, rounds // 20)):
+        type_text(app.recipe_search_input, "recipe %d" % rng.randrange(100))
+        type_text(app.pantry_input, "ingredient %d, ingredient %d" % (
+            rng.randrange(50), rng.randrange(50)
+        ))
+
+    # Add recipes to the selection, loading more pages along the way
+    for _ in range(rounds):
+        items = [x for x in app.selection.items if x.name != MORE_RECIPES]
+        if rng.random() < 0.1:
+            app.selection.value = app.selection.items[-1]
+        else:
+            app.selection.value = rng.choice(items)
+
+    for _ in range(max(1, rounds // 10)):
+        app.populate_cart_button._impl.simulate_press()
+        app.save_button._impl.simulate_press()
+
+    # Add recipes through the add recipe box, navigating back and forth
+    for i in range(rounds):
+        app.show_add_recipe_box(None)
+        dismiss_dialogs(app)
+
+        ingredient_input = find_widget(app.main_window.content, "Refine Ingredient Search")
+        type_text(ingredient_input, "ingredient %d" % rng.randrange(10))
+
+        app.ingredient_selection.value = rng.choice(app.ingredient_selection.items)
+        app.add_ingredient_button._impl.simulate_press()
+        app.recipe_name_input.value = "harness recipe %d" % i
+        app.save_recipe(None)
+
+        app.show_main_box(None)
+        dismiss_dialogs(app)
+
+
+def percentile(values, p):
+
+    values = sorted(values)
+
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(recipes=5000, ingredients=500, rounds=100):
+    """
+    Boot the app on a synthetic database and run the event storms.
+
+    :return: Latencies in seconds per handler name
+    """
+    with tempfile.TemporaryDirectory() as data_dir:
+        make_database(
+            os.path.join(data_dir, "recipe.db"), recipes, ingredients, "Mix everything. " * 20
+        ).conn.close()
+        with open(os.path.join(data_dir, "selections.json"), "w") as fp:
+            json.dump({"selected_recipes": [], "additional_items": ""}, fp)
+
+        app = HarnessApp(data_dir, "Recipe App", "com.example.recipeapp")
+        run_storms(app, rounds)
+        app.db_helper.conn.close()
+
+    return dict(app.latencies)
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--recipes", type=int, default=5000)
+    parser.add_argument("--ingredients", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=100,
+                        help="Recipes added per storm")
+    parser.add_argument("--max-p99", type=float,
+                        help="Fail when a handler's p99 latency exceeds this, in ms")
+    args = parser.parse_args(argv)
+
+    latencies = run(args.recipes, args.ingredients, args.rounds)
+
+    print(f"{'handler':26}{'calls':>7}{'p50 ms':>10}{'p99 ms':>10}")
+    slow = []
+    for name in HANDLERS:
+        values = latencies.get(name, [])
+        if not values:
+            continue
+        p50, p99 = percentile(values, 50) * 1000, percentile(values, 99) * 1000
+        print(f"{name:26}{len(values):>7}{p50:>10.2f}{p99:>10.2f}")
+        if args.max_p99 is not None and p99 > args.max_p99:
+            slow.append(name)
+
+    if slow:
+        raise SystemExit("p99 latency over {0} ms: {1}".format(args.max_p99, ", ".join(slow)))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,34 +2,25 @@
 Application to turn recipes into a shopping list
 """
 
-import pint
 import json
 import toga
 import os
 from pathlib import Path
 import shutil
 import sys
-from collections import Counter
+from recipeapp.cart import build_cart
 from recipeapp.db.sqlite_helper.SQLiteHelper import SQLiteHelper
+from recipeapp.units import UNITS
 from toga.style import Pack
 from toga.style.pack import COLUMN, ROW, CENTER
 
 # Utility section ################################################################
 
-flatten: list = lambda l: [item for sublist in l for item in sublist]
 is_android: bool = hasattr(sys, 'getandroidapilevel')
 
-def most_common(l: list) -> any:
-        """
-        Return most common element from list.
-        
-        :param lst: Input list
-        :type list: `list`
-        :return: Most common item in list
-        """
-        data = Counter(l)
-
-        return data.most_common(1)[0][0]
+# Recipes loaded at a time in the recipe selection
+RECIPE_PAGE_SIZE: int = 50
+MORE_RECIPES: str = "More recipes..."
 
 ##################################################################################
 
@@ -44,20 +35,6 @@ class RecipeApp(toga.App):
         show the main window.
         """
 
-        ureg = pint.UnitRegistry()
-        self.units = {
-            "tbs": ureg.tbs,
-            "fl oz": ureg.floz,
-            "gill": ureg.gill,
-            "cup": ureg.cup,
-            "pt": ureg.pt,
-            "qt": ureg.qt,
-            "gal": ureg.gal,
-            "lb": ureg.lb,
-            "oz": ureg.oz,
-            "": None
-        }
-
         # android_path = "/data/data/com.example.recipeapp/files"
 
         db_fname = "recipe.db"
@@ -140,6 +117,26 @@ class RecipeApp(toga.App):
         )
         main_box.add(self.additional_items)
 
+        # Add pantry filter input
+        self.pantry_input = toga.TextInput(
+            placeholder="Pantry Filter (comma separated ingredients)",
+            style=Pack(
+                padding=5
+            ),
+            on_change=self.update_recipe_selection
+        )
+        main_box.add(self.pantry_input)
+
+        # Add recipe search input
+        self.recipe_search_input = toga.TextInput(
+            placeholder="Search Recipes",
+            style=Pack(
+                padding=5
+            ),
+            on_change=self.update_recipe_selection
+        )
+        main_box.add(self.recipe_search_input)
+
         # Add recipe selection box
         self.selection = self.get_recipe_selection_box()
         main_box.add(self.selection)
@@ -157,6 +154,10 @@ class RecipeApp(toga.App):
         )
         main_box.add(self.selected_table)
 
+        # Add show instructions button box
+        self.show_instructions_button = self.get_show_instructions_button_box()
+        main_box.add(self.show_instructions_button)
+
         # Add populate cart button box
         self.populate_cart_button = self.get_populate_cart_button_box()
         main_box.add(self.populate_cart_button)
@@ -243,7 +244,7 @@ class RecipeApp(toga.App):
 
         # Add unit selection box
         self.unit_selection = toga.Selection(
-            items=self.units.keys(),
+            items=UNITS.keys(),
             accessor="name",
             style=Pack(
                 padding=5
@@ -256,6 +257,16 @@ class RecipeApp(toga.App):
         self.add_ingredient_button = self.get_add_ingredient_button()
         add_recipe_box.add(self.add_ingredient_button)
 
+        # Add instructions input
+        self.instructions_input = toga.MultilineTextInput(
+            placeholder="Instructions",
+            style=Pack(
+                padding=5,
+                height=150
+            )
+        )
+        add_recipe_box.add(self.instructions_input)
+
         # Include Add Recipe button
         save_recipe_button = self.get_save_recipe_button()
         add_recipe_box.add(save_recipe_button)
@@ -286,9 +297,58 @@ class RecipeApp(toga.App):
 
         return selection_box
     
-    def get_recipe_list(self) -> list:
+    def get_recipe_list(self, prefix="", after=None) -> list:
+        """
+        Return a page of recipe names, followed by the `MORE_RECIPES`
+        entry when there are more to load.
+        """
+        recipes = self.db_helper.get_recipes_page(
+            after, prefix.lower().strip(), RECIPE_PAGE_SIZE + 1
+        )
+
+        if len(recipes) > RECIPE_PAGE_SIZE:
+            return recipes[:RECIPE_PAGE_SIZE] + [MORE_RECIPES]
+
+        return recipes
 
-        return sorted([x[0] for x in self.db_helper.get_recipes()])
+    def set_recipe_selection_items(self, recipes):
+
+        # Replacing the items changes the value; don't add it to the table
+        self.selection.on_change = None
+        self.selection.items = recipes
+        self.selection.on_change = self.add_recipe_to_table
+
+    def update_recipe_selection(self, widget):
+
+        pantry = [
+            x.strip() for x in self.pantry_input.value.lower().split(",") if x.strip()
+        ]
+        prefix = self.recipe_search_input.value.lower().strip()
+
+        if pantry:
+            recipes = [
+                x[0] for x in self.db_helper.rank_recipes_by_coverage(
+                    pantry, RECIPE_PAGE_SIZE, prefix
+                )
+            ]
+        else:
+            recipes = self.get_recipe_list(prefix)
+
+        self.set_recipe_selection_items(recipes)
+
+    def load_more_recipes(self):
+
+        recipes = [x.name for x in self.selection.items if x.name != MORE_RECIPES]
+        more = self.get_recipe_list(
+            self.recipe_search_input.value, after=recipes[-1]
+        )
+
+        self.set_recipe_selection_items(recipes + more)
+
+        # Show the first of the new recipes
+        self.selection.on_change = None
+        self.selection.value = self.selection.items[len(recipes)]
+        self.selection.on_change = self.add_recipe_to_table
 
     def get_selected_table_box(self, selected_recipes=[]):
 
@@ -306,6 +366,10 @@ class RecipeApp(toga.App):
 
     def add_recipe_to_table(self, widget):
 
+        if self.selection.value.name == MORE_RECIPES:
+            self.load_more_recipes()
+            return
+
         self.selected_table.data.append((self.selection.value.name))
 
     def remove_recipe(self, widget, row):
@@ -313,6 +377,71 @@ class RecipeApp(toga.App):
         self.selected_table.data.remove(row)
         self.shopping_cart_table.data.clear()
 
+    def get_show_instructions_button_box(self):
+
+        button_box = toga.Button(
+            "Show Instructions",
+            on_press=self.show_recipe_details_box,
+            style=Pack(
+                padding=5
+            )
+        )
+
+        return button_box
+
+    def show_recipe_details_box(self, widget):
+
+        row = self.selected_table.selection
+        if row is None:
+            self.main_window.info_dialog(
+                "No Recipe Selected",
+                "Please select a recipe in the Selected Recipes table",
+            )
+
+            return
+
+        # Instructions are only read from the database when shown
+        instructions = "".join(
+            self.db_helper.iter_recipe_instructions(row.recipe_name)
+        )
+
+        details_box = toga.Box(style=Pack(direction=COLUMN))
+
+        # Add recipe name label
+        recipe_name_label = toga.Label(
+            row.recipe_name,
+            style=Pack(text_align=CENTER)
+        )
+        details_box.add(recipe_name_label)
+
+        # Add instructions text
+        instructions_text = toga.MultilineTextInput(
+            value=instructions or "No instructions saved for this recipe",
+            readonly=True,
+            style=Pack(
+                padding=5,
+                flex=1
+            )
+        )
+        details_box.add(instructions_text)
+
+        # Add back button, returning to the main box as it was left
+        main_box = self.main_window.content
+
+        def go_back(widget):
+            self.main_window.content = main_box
+
+        back_button = toga.Button(
+            "Back",
+            on_press=go_back,
+            style=Pack(
+                padding=5
+            )
+        )
+        details_box.add(back_button)
+
+        self.main_window.content = details_box
+
     def get_populate_cart_button_box(self):
         
         button_box = toga.Button(
@@ -428,74 +557,12 @@ class RecipeApp(toga.App):
 
     def get_ingredients(self) -> list:
 
-        ingredients = []
-
         if not hasattr(self.selected_table, "data") or not self.selected_table.data:
             return
-        
-        for row in self.selected_table.data:
-            ingredients.append(
-                self.db_helper.get_recipe_ingredients(row.recipe_name)
-            )
-        ingredients = flatten(ingredients)
-
-        ingredient_to_unit = {}
-        for ingredient in ingredients:
-            if ingredient["name"] not in ingredient_to_unit and ingredient["unit"]:
-                ingredient_to_unit[ingredient["name"]] = [ingredient["unit"]]
-            elif ingredient["unit"]:
-                ingredient_to_unit[ingredient["name"]].append(ingredient["unit"])
-        for name in ingredient_to_unit.keys():
-            ingredient_to_unit[name] = most_common(ingredient_to_unit[name])
-
-        ingredient_to_quantity = {}
-        ingredient_to_count = {}
-        for ingredient in ingredients:
-            if ingredient["name"] not in ingredient_to_quantity and ingredient["unit"]:
-                ingredient_to_quantity[ingredient["name"]] = ingredient["quantity"] * self.units[ingredient["unit"]]
-            elif ingredient["unit"]:
-                ingredient_to_quantity[ingredient["name"]] += ingredient["quantity"] * self.units[ingredient["unit"]]
-
-        for ingredient in ingredients:
-            if ingredient["name"] not in ingredient_to_count and not ingredient["unit"]:
-                ingredient_to_count[ingredient["name"]] = ingredient["quantity"]
-            elif not ingredient["unit"]:
-                ingredient_to_count[ingredient["name"]] += ingredient["quantity"]
-
-        ingredient_to_all = {**ingredient_to_quantity, **ingredient_to_count}
-
-        data = []
-
-        for k, _ in ingredient_to_all.items():
-            
-            try:
-                q = ingredient_to_quantity[k]
-            except KeyError:
-                pass
-
-            try:
-                c = ingredient_to_count[k]
-            except KeyError:
-                pass
-
-            if k not in ingredient_to_count and k in ingredient_to_quantity:
-                data.append({
-                    "ingredient": k, 
-                    "quantity": "%.2f %s" % (q.m_as(ingredient_to_unit[k]), ingredient_to_unit[k])
-                })
-            elif k in ingredient_to_count and k not in ingredient_to_quantity:
-                data.append({
-                    "ingredient": k, 
-                    "quantity": "%d items" % (c)
-                })
-            elif k in ingredient_to_count and k in ingredient_to_quantity:
-                data.append({
-                    "ingredient": k, 
-                    "quantity": "%.2f %s and %d items" % (q.m_as(ingredient_to_unit[k]), ingredient_to_unit[k], c)
-                })
-                
 
-        return data
+        return build_cart(
+            self.db_helper, [row.recipe_name for row in self.selected_table.data]
+        )
     
     def get_ingredient_selection_box(self):
         
@@ -606,7 +673,8 @@ class RecipeApp(toga.App):
 
         success = self.db_helper.add_recipe(
                 self.recipe_name_input.value.lower().strip(), 
-                ingredients
+                ingredients,
+                self.instructions_input.value
             )
         
         if success:
@@ -0,0 +1,206 @@
+"""
+Batch shopping list generation for saved selections
+
+    python -m recipeapp.batch plans/ --db recipe.db --output carts.jsonl --workers 8
+
+Inputs are ``selections.json`` files as saved by the app (one per
+household or week), or directories of them. Carts are computed exactly
+like the app's "Populate Cart" across a process pool, each worker holding
+its own read-only connection to the database, and stream to a JSONL or
+CSV file in input order.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from recipeapp.cart import build_cart
+from recipeapp.db.sqlite_helper.SQLiteHelper import SQLiteHelper
+from recipeapp.utils import map_in_pool
+
+# Read-only helper of each worker process
+db_helper = None
+
+
+def init_worker(db_path: str):
+    """
+    Open the worker's read-only connection to the database.
+    """
+    global db_helper
+
+    db_helper = SQLiteHelper(db_path, read_only=True)
+
+
+def compute_plan(path: str) -> dict:
+    """
+    Compute the shopping list of one selections file.
+
+    :param path: Selections file
+    :return: ``{"plan", "cart", "additional_items"}``, or ``{"plan",
+        "error"}`` when the file can't be read
+    """
+    try:
+        with open(path) as fp:
+            data = json.load(fp)
+        recipes = [str(x) for x in data["selected_recipes"]]
+        additional_items = data.get("additional_items")
+        if additional_items is None:
+            additional_items = ""
+        elif not isinstance(additional_items, str):
+            raise TypeError("additional_items must be a string")
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        return {"plan": path, "error": repr(e)}
+
+    return {
+        "plan": path,
+        "cart": build_cart(db_helper, recipes),
+        "additional_items": additional_items,
+    }
+
+
+def compute_plans(paths: list) -> list:
+
+    return [compute_plan(x) for x in paths]
+
+
+def find_plans(paths: list):
+    """
+    Yield the JSON files among the given files and directories.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(
+                os.path.join(root, x)
+                for root, _, names in os.walk(path) for x in names
+                if x.lower().endswith(".json")
+            )
+        else:
+            yield path
+
+
+def compute_in_pool(plans, db_path: str, workers: int, chunk_size: int = 64):
+    """
+    Compute plans in a process pool, yielding results in input order.
+    """
+    return map_in_pool(compute_plans, plans, workers, init_worker, (db_path,), chunk_size)
+
+
+class JSONLWriter:
+
+    def __init__(self, fp):
+        self.fp = fp
+
+    def write(self, result):
+        self.fp.write(json.dumps(result) + "\n")
+
+
+class CSVWriter:
+    """
+    One ``plan, item, quantity`` row per cart entry, then one per line of
+    additional items with an empty quantity.
+    """
+
+    def __init__(self, fp):
+        self.writer = csv.writer(fp)
+        self.writer.writerow(["plan", "item", "quantity"])
+
+    def write(self, result):
+        if "error" in result:
+            return
+
+        for x in result["cart"]:
+            self.writer.writerow([result["plan"], x["ingredient"], x["quantity"]])
+        for line in result["additional_items"].splitlines():
+            if line.strip():
+                self.writer.writerow([result["plan"], line.strip(), ""])
+
+
+def run_batch(paths: list, db_path: str, output_path: str, output_format: str = None,
+              workers: int = None, chunk_size: int = 64, progress=None) -> dict:
+    """
+    Compute the shopping lists of many selections files.
+
+    :param paths: Selections files or directories
+    :param db_path: Path of the SQLite database
+    :param output_path: File the results are written to
+    :param output_format: ``"jsonl"`` or ``"csv"``, from the output
+        extension if unset
+    :param workers: Worker processes, one per CPU when unset
+    :param chunk_size: Plans sent to a worker at a time
+    :param progress: Called with the running statistics every chunk
+    :return: Statistics: plans read, failed plans, elapsed seconds and
+        plans/sec
+    """
+    if output_format is None:
+        output_format = "csv" if output_path.lower().endswith(".csv") else "jsonl"
+    workers = workers or os.cpu_count() or 1
+
+    # Opening the database read-write would create a missing one
+    if not os.path.exists(db_path):
+        raise FileNotFoundError("{0} does not exist".format(db_path))
+
+    # Workers only read, so bring older databases up to date first
+    SQLiteHelper(db_path).conn.close()
+
+    stats = {"plans": 0, "failed": 0, "elapsed": 0.0, "plans_per_sec": 0.0}
+    start = time.perf_counter()
+
+    with open(output_path, "w", newline="") as fp:
+        writer = CSVWriter(fp) if output_format == "csv" else JSONLWriter(fp)
+
+        for result in compute_in_pool(find_plans(paths), db_path, workers, chunk_size):
+            writer.write(result)
+            stats["plans"] += 1
+            if "error" in result:
+                stats["failed"] += 1
+                print("{plan}: {error}".format(**result), file=sys.stderr)
+
+            if progress and stats["plans"] % chunk_size == 0:
+                stats["elapsed"] = time.perf_counter() - start
+                stats["plans_per_sec"] = stats["plans"] / stats["elapsed"]
+                progress(stats)
+
+    stats["elapsed"] = time.perf_counter() - start
+    stats["plans_per_sec"] = stats["plans"] / stats["elapsed"]
+
+    return stats
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Compute shopping lists for saved selections")
+    parser.add_argument("paths", nargs="+", help="Selections files or directories")
+    parser.add_argument("--db", required=True, help="Path of recipe.db")
+    parser.add_argument("--output", required=True, help="JSONL or CSV file written")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None,
+                        help="Output format, from the output extension by default")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes, one per CPU by default")
+    parser.add_argument("--chunk-size", type=int, default=64,
+                        help="Plans sent to a worker at a time")
+    args = parser.parse_args(argv)
+
+    def progress(stats):
+        print(
+            "\r{plans} plans, {plans_per_sec:.0f} plans/sec".format(**stats),
+            end="", file=sys.stderr, flush=True
+        )
+
+    try:
+        stats = run_batch(args.paths, args.db, args.output, args.format, args.workers,
+                          args.chunk_size, progress)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+
+    print(file=sys.stderr)
+    print(
+        "Computed {plans} plans in {elapsed:.2f}s ({plans_per_sec:.0f} plans/sec), "
+        "{failed} failed".format(**stats)
+    )
+
+
+if __name__ == "__main__":
+    main()
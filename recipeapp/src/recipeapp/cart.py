@@ -0,0 +1,282 @@
+"""
+Shopping cart aggregation
+
+The shopping list is normally aggregated inside SQLite by
+``SQLiteHelper.compute_cart`` and formatted by ``build_cart``.
+
+Cart rows are ``(ingredient id, ingredient name, quantity, unit)`` tuples,
+one per recipe ingredient of every selected recipe, as returned by
+``SQLiteHelper.get_cart_rows``. ``aggregate_rows`` turns them into the same
+shopping list in memory, as a reference for the SQL aggregation and for
+benchmarks: the pure Python backend converts row by row through pint, the
+NumPy one converts whole columns with a factor lookup.
+"""
+
+from collections import Counter
+from functools import lru_cache
+
+from recipeapp.units import UNITS, DIMENSIONS, get_pint_units
+
+
+@lru_cache(maxsize=None)
+def get_numpy():
+    """
+    Import NumPy on first use.
+
+    :return: The ``numpy`` module, ``None`` when it is not installed
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    return numpy
+
+
+def most_common(l: list) -> any:
+        """
+        Return most common element from list.
+
+        :param lst: Input list
+        :type list: `list`
+        :return: Most common item in list
+        """
+        data = Counter(l)
+
+        return data.most_common(1)[0][0]
+
+
+def build_cart(db_helper, recipe_names: list) -> list:
+    """
+    Shopping list of the given recipes, aggregated by the database.
+
+    :param db_helper: ``SQLiteHelper`` of the recipe database
+    :param recipe_names: Recipe names, repeated for recipes cooked twice
+    :return: ``{"ingredient": name, "quantity": text}`` dictionaries
+    """
+    recipe_ids = db_helper.get_recipe_ids(recipe_names)
+
+    return format_cart(db_helper.compute_cart(recipe_ids))
+
+
+def format_cart(totals: list) -> list:
+    """
+    Format per-dimension ingredient totals into shopping list entries.
+
+    :param totals: ``(ingredient id, ingredient name, dimension, quantity,
+        unit)`` tuples, as returned by ``SQLiteHelper.compute_cart``
+    :return: ``{"ingredient": name, "quantity": text}`` dictionaries
+    """
+    ingredients = {}
+    for ingredient_id, name, dimension, quantity, unit in totals:
+        _, dimensions, unknown = ingredients.setdefault(ingredient_id, (name, {}, []))
+        if dimension is None:
+            # Unit unknown to UNITS, shown as stored
+            unknown.append((quantity, unit))
+        else:
+            dimensions[dimension] = (quantity, unit)
+
+    data = []
+
+    for name, dimensions, unknown in ingredients.values():
+
+        measures = [dimensions[x] for x in DIMENSIONS[1:] if x in dimensions]
+        measures += unknown
+        count = dimensions.get("count", (None,))[0]
+
+        data.append({
+            "ingredient": name,
+            "quantity": format_quantity(measures, count)
+        })
+
+    return data
+
+
+def aggregate_rows(rows: list, units: dict = None, backend: str = None) -> list:
+    """
+    Aggregate cart rows in memory into one shopping list entry per
+    ingredient.
+
+    :param rows: Cart rows
+    :param units: Pint unit per unit name, loaded on demand if unset
+    :param backend: ``"python"`` or ``"numpy"``, picked automatically if unset
+    :return: ``{"ingredient": name, "quantity": text}`` dictionaries
+    """
+    if backend is None:
+        backend = "python" if get_numpy() is None else "numpy"
+
+    if backend == "numpy":
+        return aggregate_numpy(rows)
+
+    return aggregate_python(rows, units or get_pint_units())
+
+
+def format_quantity(measures: list, count: float) -> str:
+    """
+    Format the cart quantity of an ingredient.
+
+    :param measures: ``(magnitude, unit)`` pairs, one per dimension
+    :param count: Number of items, ``None`` when not counted
+    :return: Quantity text
+    """
+    parts = ["%.2f %s" % (m, u) for m, u in measures]
+    if count is not None:
+        parts.append("%d items" % (count))
+
+    return " and ".join(parts)
+
+
+def aggregate_python(rows: list, units: dict) -> list:
+
+    ingredient_to_unit = {}
+    for _, name, _, unit in rows:
+        if name not in ingredient_to_unit and unit:
+            ingredient_to_unit[name] = [unit]
+        elif unit:
+            ingredient_to_unit[name].append(unit)
+    for name in ingredient_to_unit.keys():
+        ingredient_to_unit[name] = most_common(ingredient_to_unit[name])
+
+    ingredient_to_quantity = {}
+    ingredient_to_count = {}
+    for _, name, quantity, unit in rows:
+        if name not in ingredient_to_quantity and unit:
+            ingredient_to_quantity[name] = quantity * units[unit]
+        elif unit:
+            ingredient_to_quantity[name] += quantity * units[unit]
+
+    for _, name, quantity, unit in rows:
+        if name not in ingredient_to_count and not unit:
+            ingredient_to_count[name] = quantity
+        elif not unit:
+            ingredient_to_count[name] += quantity
+
+    ingredient_to_all = {**ingredient_to_quantity, **ingredient_to_count}
+
+    data = []
+
+    for k in ingredient_to_all:
+
+        measures = []
+        if k in ingredient_to_quantity:
+            unit = ingredient_to_unit[k]
+            measures.append((ingredient_to_quantity[k].m_as(unit), unit))
+
+        data.append({
+            "ingredient": k,
+            "quantity": format_quantity(measures, ingredient_to_count.get(k))
+        })
+
+    return data
+
+
+def aggregate_numpy(rows: list) -> list:
+    """
+    Columnar version of ``aggregate_python``.
+
+    Quantities are converted to each dimension's base unit with a factor
+    lookup, summed per ``(ingredient, dimension)`` with ``np.bincount`` and
+    shown in the unit used most often for it, ties going to the unit seen
+    first. An ingredient measured in several dimensions (mass and volume,
+    say) gets one entry per dimension where pint would refuse to add them.
+    Units not in ``UNITS``, left by older versions, are summed as stored
+    and listed after the others, as ``SQLiteHelper.compute_cart`` does.
+    """
+    if not rows:
+        return []
+
+    np = get_numpy()
+
+    # Each unknown unit is a dimension of its own, with a factor of 1
+    unknown = list(dict.fromkeys(
+        x[3] for x in rows if x[3] is not None and x[3] not in UNITS
+    ))
+    unit_names = list(UNITS) + unknown
+    unit_codes = {name: i for i, name in enumerate(unit_names)}
+    unit_codes[None] = unit_codes[""]
+    factors = np.array([UNITS[u][2] for u in UNITS] + [1.0] * len(unknown))
+    unit_dims = np.array(
+        [DIMENSIONS.index(UNITS[u][1]) for u in UNITS]
+        + list(range(len(DIMENSIONS), len(DIMENSIONS) + len(unknown)))
+    )
+    n_units, n_dims = len(unit_names), len(DIMENSIONS) + len(unknown)
+
+    n = len(rows)
+    ids, _, quantities, units = zip(*rows)
+    ids = np.array(ids, dtype=np.int64)
+    quantities = np.array(quantities, dtype=np.float64)
+    codes = np.array(list(map(unit_codes.__getitem__, units)), dtype=np.int64)
+
+    uniq, first, inv = np.unique(ids, return_index=True, return_inverse=True)
+    inv = inv.ravel()
+    names = [rows[i][1] for i in first]
+    n_ingredients = len(uniq)
+
+    dims = unit_dims[codes]
+    measured = dims != 0
+    position = np.arange(n)
+
+    # Totals in base units per (ingredient, dimension), and item counts
+    groups = inv * n_dims + dims
+    totals = np.bincount(
+        groups[measured],
+        weights=quantities[measured] * factors[codes[measured]],
+        minlength=n_ingredients * n_dims
+    )
+    counts = np.bincount(
+        inv[~measured], weights=quantities[~measured], minlength=n_ingredients
+    )
+    has_count = np.bincount(inv[~measured], minlength=n_ingredients) > 0
+
+    # Display unit: most frequent unit per group, first seen on ties
+    keys = groups[measured] * n_units + codes[measured]
+    key_values, key_first, key_counts = np.unique(
+        keys, return_index=True, return_counts=True
+    )
+    key_first = position[measured][key_first]
+    key_groups = key_values // n_units
+    order = np.lexsort((key_first, -key_counts, key_groups))
+    leaders = order[np.diff(key_groups[order], prepend=-1) != 0]
+    display_units = {
+        int(key_groups[i]): int(key_values[i] % n_units) for i in leaders
+    }
+    first_seen = {int(key_groups[i]): int(key_first[i]) for i in leaders}
+
+    # Ingredients measured anywhere come first, then counted-only ones
+    first_measured = np.full(n_ingredients, n)
+    seen, index = np.unique(inv[measured], return_index=True)
+    first_measured[seen] = position[measured][index]
+    first_counted = np.full(n_ingredients, n)
+    seen, index = np.unique(inv[~measured], return_index=True)
+    first_counted[seen] = position[~measured][index]
+    is_measured = first_measured < n
+    ordering = np.lexsort((first_counted, first_measured, ~is_measured))
+
+    data = []
+
+    for i in ordering.tolist():
+
+        measures = []
+        for dim in range(1, len(DIMENSIONS)):
+            code = display_units.get(i * n_dims + dim)
+            if code is not None:
+                measures.append((
+                    totals[i * n_dims + dim] / factors[code], unit_names[code]
+                ))
+
+        # Unknown units in the order first seen
+        unknown_groups = sorted(
+            (first_seen[i * n_dims + dim], i * n_dims + dim)
+            for dim in range(len(DIMENSIONS), n_dims) if i * n_dims + dim in first_seen
+        )
+        for _, group in unknown_groups:
+            measures.append((totals[group], unit_names[display_units[group]]))
+
+        data.append({
+            "ingredient": names[i],
+            "quantity": format_quantity(
+                measures, counts[i] if has_count[i] else None
+            )
+        })
+
+    return data
@@ -0,0 +1,435 @@
+"""
+Compact columnar catalog files for moving recipes between devices
+
+    python -m recipeapp.catalog export recipe.db recipes.rcat
+    python -m recipeapp.catalog import recipes.rcat new.db
+
+A catalog holds the ingredients, recipes, recipe ingredients and recipe
+instructions of a database. It starts with the ``RCAT`` magic and a format
+version, followed by blocks::
+
+    kind (1 byte) | rows (u32) | columns (u8) | columns ...
+
+where every column is its zlib-compressed size (u32) and data. Integers
+and floats are packed little-endian arrays. Names are dictionary encoded:
+recipe ingredients refer to ingredients and units by their position in the
+ingredient and unit blocks. String and blob columns are the u32 lengths of
+all values followed by the values themselves.
+
+Blocks are written as the database is read, so exports run in constant
+memory. Imports map the file and decode columns straight out of the
+decompressed buffers into a fresh database, in a single transaction.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from contextlib import closing
+from itertools import repeat
+
+from recipeapp.db.sqlite_helper.SQLiteHelper import SQLiteHelper
+from recipeapp.units import to_base
+
+MAGIC = b"RCAT"
+VERSION = 1
+
+HEADER = struct.Struct("<4sH")
+BLOCK = struct.Struct("<cIB")
+COLUMN = struct.Struct("<I")
+
+INGREDIENTS = b"I"
+UNITS = b"U"
+RECIPES = b"R"
+END = b"E"
+
+# Unit code of recipe ingredients without a unit
+NULL_UNIT = 0xFFFF
+
+# Indexes of SQLiteHelper.create_schema dropped during imports
+SECONDARY_INDEXES = [
+    "recipe_ingredient_ingredient_idx",
+    "recipe_ingredient_recipe_idx",
+    "recipe_name_nocase_idx",
+]
+
+
+# Column encoding ################################################################
+
+def pack_numbers(typecode: str, values) -> bytes:
+
+    numbers = array(typecode, values)
+    if sys.byteorder == "big":
+        numbers.byteswap()
+
+    return numbers.tobytes()
+
+
+def unpack_numbers(data, typecode: str):
+    """
+    View a packed numeric column without copying it.
+
+    :param data: Column data
+    :param typecode: ``array`` type code of the numbers
+    :return: Sequence of numbers
+    """
+    if sys.byteorder == "big":
+        numbers = array(typecode, data)
+        numbers.byteswap()
+        return numbers
+
+    return memoryview(data).cast(typecode)
+
+
+def pack_bytes(values: list) -> bytes:
+
+    return pack_numbers("I", [len(x) for x in values]) + b"".join(values)
+
+
+def unpack_bytes(data, count: int) -> list:
+    """
+    Split a bytes column into one memoryview per value, without copying.
+
+    :param data: Column data
+    :param count: Number of values
+    :return: ``memoryview`` per value
+    """
+    view = memoryview(data)
+    lengths = unpack_numbers(view[:4 * count], "I")
+
+    values = []
+    offset = 4 * count
+    for length in lengths:
+        values.append(view[offset:offset + length])
+        offset += length
+
+    return values
+
+
+def pack_strings(values: list) -> bytes:
+
+    return pack_bytes([x.encode() for x in values])
+
+
+def unpack_strings(data, count: int) -> list:
+
+    return [str(x, "utf-8") for x in unpack_bytes(data, count)]
+
+
+# Writing ########################################################################
+
+def write_block(fp, kind: bytes, count: int, columns: list, level: int = 6):
+    """
+    Write one block of columns.
+
+    :param fp: Binary file
+    :param kind: Block kind
+    :param count: Number of rows in the block
+    :param columns: Packed column data
+    :param level: zlib compression level
+    """
+    fp.write(BLOCK.pack(kind, count, len(columns)))
+    for column in columns:
+        data = zlib.compress(column, level)
+        fp.write(COLUMN.pack(len(data)))
+        fp.write(data)
+
+
+def export_catalog(db_path: str, catalog_path: str, chunk_size: int = 4096) -> dict:
+    """
+    Export a recipe database into a catalog file.
+
+    :param db_path: Path of the SQLite database
+    :param catalog_path: Path of the catalog written
+    :param chunk_size: Ingredients or recipes per block
+    :return: Statistics: ingredients, recipes, recipe ingredient rows,
+        rows skipped for lack of an ingredient or recipe, catalog size in
+        bytes and elapsed seconds
+    """
+    if not os.path.exists(db_path):
+        raise FileNotFoundError("{0} does not exist".format(db_path))
+
+    start = time.perf_counter()
+
+    helper = SQLiteHelper(db_path, read_only=True)
+    cur = helper.conn.cursor()
+    rows_cur = helper.conn.cursor()
+    stats = {"ingredients": 0, "recipes": 0, "rows": 0, "skipped": 0}
+
+    with open(catalog_path, "wb") as fp:
+        fp.write(HEADER.pack(MAGIC, VERSION))
+
+        # Ingredients, remembering their position for the recipe ingredients
+        ingredient_codes = {}
+        cur.execute("SELECT id, name FROM ingredient ORDER BY id")
+        for chunk in iter(lambda: cur.fetchmany(chunk_size), []):
+            for ingredient_id, _ in chunk:
+                ingredient_codes[ingredient_id] = len(ingredient_codes)
+            write_block(fp, INGREDIENTS, len(chunk), [pack_strings([x[1] for x in chunk])])
+        stats["ingredients"] = len(ingredient_codes)
+
+        cur.execute("SELECT DISTINCT unit FROM recipe_ingredient WHERE unit IS NOT NULL")
+        units = sorted(x[0] for x in cur.fetchall())
+        unit_codes = {x: i for i, x in enumerate(units)}
+        unit_codes[None] = NULL_UNIT
+        write_block(fp, UNITS, len(units), [pack_strings(units)])
+
+        # Recipes, each block carrying the ingredients of its recipes
+        query = """
+                SELECT recipe, ingredient, quantity, unit FROM recipe_ingredient
+                WHERE recipe BETWEEN ? AND ?
+                ORDER BY recipe;
+                """
+        # Older databases have no instructions table, and are exported as
+        # they are rather than migrated
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipe_instructions'"
+        )
+        if cur.fetchone():
+            cur.execute("""
+                        SELECT r.id, r.name, ri.data FROM recipe r
+                        LEFT JOIN recipe_instructions ri
+                             ON ri.recipe = r.id AND ri.codec = 'zlib'
+                        ORDER BY r.id
+                        """)
+        else:
+            cur.execute("SELECT id, name, NULL FROM recipe ORDER BY id")
+        for chunk in iter(lambda: cur.fetchmany(chunk_size), []):
+            rows_cur.execute(query, (chunk[0][0], chunk[-1][0]))
+            rows = rows_cur.fetchall()
+
+            # Rows left without an ingredient or a recipe by older versions
+            # can't be encoded
+            counts = dict.fromkeys((x[0] for x in chunk), 0)
+            known = [x for x in rows if x[0] in counts and x[1] in ingredient_codes]
+            stats["skipped"] += len(rows) - len(known)
+            rows = known
+
+            for row in rows:
+                counts[row[0]] += 1
+
+            write_block(fp, RECIPES, len(chunk), [
+                pack_strings([x[1] for x in chunk]),
+                pack_bytes([x[2] or b"" for x in chunk]),
+                pack_numbers("I", counts.values()),
+                pack_numbers("I", [ingredient_codes[x[1]] for x in rows]),
+                pack_numbers("H", [unit_codes[x[3]] for x in rows]),
+                pack_numbers("d", [x[2] for x in rows]),
+            ])
+            stats["recipes"] += len(chunk)
+            stats["rows"] += len(rows)
+
+        write_block(fp, END, 0, [])
+
+    helper.conn.close()
+
+    stats["bytes"] = os.path.getsize(catalog_path)
+    stats["elapsed"] = time.perf_counter() - start
+
+    return stats
+
+
+# Reading ########################################################################
+
+def read_header(data):
+    """
+    Check a catalog starts with the magic and a supported format version.
+
+    :param data: Catalog contents
+    :raises ValueError: When it doesn't
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Not a recipe catalog")
+
+    magic, version = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a recipe catalog")
+    if version != VERSION:
+        raise ValueError("Unsupported catalog version: {0}".format(version))
+
+
+def read_blocks(data):
+    """
+    Yield the blocks of a catalog.
+
+    :param data: Catalog contents, typically a ``mmap``
+    :return: ``(kind, rows, columns)`` per block, columns decompressed
+    """
+    # The view is released when the generator finishes or is closed, so
+    # that a mapped file can be closed afterwards
+    with memoryview(data) as view:
+        read_header(view)
+
+        offset = HEADER.size
+        while True:
+            kind, count, n_columns = BLOCK.unpack_from(view, offset)
+            offset += BLOCK.size
+
+            columns = []
+            for _ in range(n_columns):
+                size, = COLUMN.unpack_from(view, offset)
+                offset += COLUMN.size
+                with view[offset:offset + size] as column:
+                    columns.append(zlib.decompress(column))
+                offset += size
+
+            if kind == END:
+                return
+
+            yield kind, count, columns
+
+
+def import_catalog(catalog_path: str, db_path: str) -> dict:
+    """
+    Load a catalog file into a new recipe database.
+
+    The database is built in a temporary file next to ``db_path`` and only
+    moved there once complete, so a failed import leaves nothing behind.
+
+    :param catalog_path: Path of the catalog
+    :param db_path: Path of the database created, which must not exist
+    :return: Statistics: ingredients, recipes, recipe ingredient rows and
+        elapsed seconds
+    """
+    if os.path.exists(db_path):
+        raise FileExistsError("{0} already exists".format(db_path))
+
+    start = time.perf_counter()
+    stats = {"ingredients": 0, "recipes": 0, "rows": 0}
+
+    with open(catalog_path, "rb") as fp, \
+            mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        read_header(data)
+
+        tmp_path = "{0}.{1}.tmp".format(db_path, os.getpid())
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            helper = SQLiteHelper(tmp_path)
+            try:
+                load_blocks(helper, data, stats)
+                helper.create_schema()
+            finally:
+                helper.conn.close()
+            os.replace(tmp_path, db_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    stats["elapsed"] = time.perf_counter() - start
+
+    return stats
+
+
+def load_blocks(helper, data, stats: dict):
+    """
+    Insert the blocks of a catalog into an empty database, in a single
+    transaction.
+
+    :param helper: ``SQLiteHelper`` of the new database
+    :param data: Catalog contents
+    :param stats: Ingredient, recipe and row counts, updated as blocks load
+    """
+    cur = helper.conn.cursor()
+
+    # Indexes are quicker to build once the tables are full than to keep up
+    # to date row by row. create_schema puts them back afterwards.
+    for index in SECONDARY_INDEXES:
+        cur.execute("DROP INDEX {0}".format(index))
+
+    # Unit code -> (unit name, factor to base unit, dimension)
+    units = {NULL_UNIT: (None, *to_base(1, None))}
+
+    with closing(read_blocks(data)) as blocks, helper.conn:
+        for kind, count, columns in blocks:
+            if kind == INGREDIENTS:
+                first = stats["ingredients"] + 1
+                cur.executemany(
+                    "INSERT INTO ingredient (id, name) VALUES (?, ?)",
+                    zip(range(first, first + count), unpack_strings(columns[0], count))
+                )
+                stats["ingredients"] += count
+
+            elif kind == UNITS:
+                for code, name in enumerate(unpack_strings(columns[0], count)):
+                    units[code] = (name, *to_base(1, name))
+
+            elif kind == RECIPES:
+                names = unpack_strings(columns[0], count)
+                instructions = unpack_bytes(columns[1], count)
+                counts = unpack_numbers(columns[2], "I")
+                ingredient_codes = unpack_numbers(columns[3], "I")
+                unit_codes = unpack_numbers(columns[4], "H")
+                quantities = unpack_numbers(columns[5], "d")
+
+                first = stats["recipes"] + 1
+                recipe_ids = range(first, first + count)
+                cur.executemany(
+                    "INSERT INTO recipe (id, name) VALUES (?, ?)", zip(recipe_ids, names)
+                )
+                cur.executemany(
+                    "INSERT INTO recipe_instructions (recipe, codec, data) VALUES (?, 'zlib', ?)",
+                    ((i, x) for i, x in zip(recipe_ids, instructions) if len(x))
+                )
+
+                row_recipes = (i for i, n in zip(recipe_ids, counts) for i in repeat(i, n))
+                query = """
+                        INSERT INTO recipe_ingredient
+                        (recipe, ingredient, quantity, unit, base_quantity, dimension)
+                        VALUES (?, ?, ?, ?, ?, ?);
+                        """
+                cur.executemany(query, (
+                    (recipe, ingredient + 1, quantity, units[unit][0],
+                     None if units[unit][1] is None else quantity * units[unit][1],
+                     units[unit][2])
+                    for recipe, ingredient, unit, quantity
+                    in zip(row_recipes, ingredient_codes, unit_codes, quantities)
+                ))
+
+                stats["recipes"] += count
+                stats["rows"] += len(quantities)
+
+            else:
+                raise ValueError("Unknown catalog block: {0!r}".format(kind))
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Export and import recipe catalogs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export recipe.db to a catalog")
+    export_parser.add_argument("db", help="Path of recipe.db")
+    export_parser.add_argument("catalog", help="Path of the catalog written")
+    export_parser.add_argument("--chunk-size", type=int, default=4096,
+                               help="Recipes per block")
+
+    import_parser = commands.add_parser("import", help="Load a catalog into a new database")
+    import_parser.add_argument("catalog", help="Path of the catalog")
+    import_parser.add_argument("db", help="Path of the database created")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        stats = export_catalog(args.db, args.catalog, args.chunk_size)
+        print(
+            "Exported {recipes} recipes, {ingredients} ingredients and {rows} recipe "
+            "ingredients in {elapsed:.2f}s: {bytes} bytes".format(**stats)
+        )
+        if stats["skipped"]:
+            print("Skipped {skipped} recipe ingredients without an ingredient or recipe".format(**stats))
+    else:
+        stats = import_catalog(args.catalog, args.db)
+        print(
+            "Imported {recipes} recipes, {ingredients} ingredients and {rows} recipe "
+            "ingredients in {elapsed:.2f}s".format(**stats)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+
+class IngredientIndex:
+    """
+    In-memory inverted index from ingredient to recipes.
+
+    Every ingredient keeps a sorted posting list of the recipes using it
+    and a bitset (a Python ``int``), so containment and coverage queries
+    are chains of ``&``, ``|`` and ``^`` on whole recipe sets. Bit ``n`` of
+    a bitset stands for the ``n``-th recipe in name order: recipes come out
+    of a bitset sorted by name, and the recipes starting with a prefix are
+    a contiguous range of bits.
+
+    Indexes are not modified once built: ``with_recipes`` and
+    ``without_recipes`` return updated copies, so an index can be shared
+    between threads while recipes are being saved.
+    """
+
+    def __init__(self, rows, recipe_names):
+        """
+        :param rows: ``(ingredient, recipe)`` id pairs sorted by ingredient
+        :param recipe_names: Mapping of recipe id to recipe name
+        """
+        self.recipe_names = recipe_names
+        self.recipe_sizes = Counter()
+        self.postings = {}
+        self.bitsets = {}
+
+        # Recipe ids and names by bit position
+        self.recipe_ids = sorted(recipe_names, key=recipe_names.__getitem__)
+        self.sorted_names = [recipe_names[x] for x in self.recipe_ids]
+
+        for ingredient, recipe in rows:
+            if ingredient is None or recipe not in recipe_names:
+                continue
+            postings = self.postings.get(ingredient)
+            if postings is None:
+                postings = self.postings[ingredient] = array("q")
+            if not postings or postings[-1] != recipe:
+                postings.append(recipe)
+                self.recipe_sizes[recipe] += 1
+
+        positions = {x: i for i, x in enumerate(self.recipe_ids)}
+        for ingredient, postings in self.postings.items():
+            self.bitsets[ingredient] = self._ids_to_bits(postings, positions)
+
+        # Recipes by number of ingredients, for coverage rankings
+        sizes = {}
+        for recipe, size in self.recipe_sizes.items():
+            sizes.setdefault(size, []).append(recipe)
+        self.size_bitsets = {
+            size: self._ids_to_bits(recipes, positions) for size, recipes in sizes.items()
+        }
+
+    def _ids_to_bits(self, ids, positions):
+        bits = bytearray(len(self.recipe_ids) // 8 + 1)
+        for i in ids:
+            position = positions[i]
+            bits[position >> 3] |= 1 << (position & 7)
+
+        return int.from_bytes(bits, "little")
+
+    def _bits_to_ids(self, bits):
+        ids = []
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+        for offset, byte in enumerate(data):
+            while byte:
+                low = byte & -byte
+                ids.append(self.recipe_ids[(offset << 3) + low.bit_length() - 1])
+                byte ^= low
+
+        return ids
+
+    def _first_ids(self, bits, limit):
+        # Lowest set bits one at a time, cheaper than _bits_to_ids when
+        # only a few of many recipes are wanted
+        ids = []
+        while bits and len(ids) < limit:
+            low = bits & -bits
+            ids.append(self.recipe_ids[low.bit_length() - 1])
+            bits ^= low
+
+        return ids
+
+    def _prefix_bits(self, prefix):
+        """
+        Bitset of the recipes whose name starts with ``prefix``.
+        """
+        start = bisect_left(self.sorted_names, prefix)
+        end = bisect_left(self.sorted_names, prefix + "\U0010ffff", start)
+
+        return ((1 << end) - 1) ^ ((1 << start) - 1)
+
+    def with_recipes(self, recipes):
+        """
+        Return a copy of the index with recipes added.
+
+        Each recipe moves the bits of the recipes named after it up by one,
+        which is a couple of shifts per ingredient instead of a rebuild.
+
+        :param recipes: ``(recipe id, name, ingredient ids)`` tuples of
+            recipes not in the index
+        :type recipes: ``list``
+        :return: Updated index
+        :rtype: ``IngredientIndex``
+        """
+        index = self._copy()
+
+        for recipe, name, ingredient_ids in recipes:
+            ingredient_ids = set(ingredient_ids) - {None}
+            position = bisect_left(index.sorted_names, name)
+            index.recipe_ids.insert(position, recipe)
+            index.sorted_names.insert(position, name)
+            index.recipe_names[recipe] = name
+
+            index._insert_bit(index.bitsets, position, ingredient_ids)
+            for ingredient in ingredient_ids:
+                postings = index.postings.get(ingredient)
+                postings = index.postings[ingredient] = array("q", postings or ())
+                insort(postings, recipe)
+
+            if ingredient_ids:
+                size = len(ingredient_ids)
+                index.recipe_sizes[recipe] = size
+                index._insert_bit(index.size_bitsets, position, {size})
+            else:
+                index._insert_bit(index.size_bitsets, position, set())
+
+        return index
+
+    def without_recipes(self, recipe_ids):
+        """
+        Return a copy of the index with recipes removed.
+
+        :param recipe_ids: Recipe ids, those not in the index are ignored
+        :type recipe_ids: ``list``
+        :return: Updated index
+        :rtype: ``IngredientIndex``
+        """
+        index = self._copy()
+
+        for recipe in set(recipe_ids):
+            name = index.recipe_names.pop(recipe, None)
+            if name is None:
+                continue
+            position = bisect_left(index.sorted_names, name)
+            del index.recipe_ids[position]
+            del index.sorted_names[position]
+            index.recipe_sizes.pop(recipe, None)
+
+            for ingredient in index._remove_bit(index.bitsets, position):
+                postings = array("q", index.postings[ingredient])
+                del postings[bisect_left(postings, recipe)]
+                if postings:
+                    index.postings[ingredient] = postings
+                else:
+                    del index.postings[ingredient]
+            index._remove_bit(index.size_bitsets, position)
+
+        return index
+
+    def _copy(self):
+        # Bitsets are immutable ints and posting arrays are replaced, not
+        # modified, so copying the containers is enough
+        index = object.__new__(IngredientIndex)
+        index.__dict__.update(self.__dict__)
+        index.recipe_names = dict(self.recipe_names)
+        index.recipe_sizes = Counter(self.recipe_sizes)
+        index.postings = dict(self.postings)
+        index.bitsets = dict(self.bitsets)
+        index.size_bitsets = dict(self.size_bitsets)
+        index.recipe_ids = list(self.recipe_ids)
+        index.sorted_names = list(self.sorted_names)
+
+        return index
+
+    @staticmethod
+    def _insert_bit(bitsets, position, keys):
+        """
+        Open a bit at ``position`` in every bitset, set for ``keys``.
+        """
+        low = (1 << position) - 1
+        for key, bits in bitsets.items():
+            if bits >> position:
+                bits = (bits >> position << position + 1) | (bits & low)
+            bitsets[key] = bits | (key in keys) << position
+        for key in keys - bitsets.keys():
+            bitsets[key] = 1 << position
+
+    @staticmethod
+    def _remove_bit(bitsets, position):
+        """
+        Drop the bit at ``position`` from every bitset.
+
+        :return: Keys whose bitset had it set
+        """
+        low = (1 << position) - 1
+        had = []
+        for key, bits in list(bitsets.items()):
+            if not bits >> position:
+                continue
+            if bits >> position & 1:
+                had.append(key)
+            bits = (bits >> position + 1 << position) | (bits & low)
+            if bits:
+                bitsets[key] = bits
+            else:
+                del bitsets[key]
+
+        return had
+
+    def recipes_with_all(self, ingredient_ids):
+        """
+        Return ids of the recipes using every one of the given ingredients.
+
+        :param ingredient_ids: Ingredient ids
+        :type ingredient_ids: ``list``
+        :return: Recipe ids, sorted by recipe name
+        :rtype: ``list``
+        """
+        if not ingredient_ids:
+            return []
+
+        bitsets = sorted(
+            (self.bitsets.get(i, 0) for i in set(ingredient_ids)),
+            key=lambda b: b.bit_length()
+        )
+        bits = bitsets[0]
+        for other in bitsets[1:]:
+            if not bits:
+                break
+            bits &= other
+
+        return self._bits_to_ids(bits)
+
+    def match_counts(self, ingredient_ids):
+        """
+        Count, for every recipe, how many of the given ingredients it uses.
+
+        Counts are kept bit-sliced: bit ``n`` of the ``j``-th returned
+        bitset is bit ``j`` of the count of recipe ``n``, so adding an
+        ingredient is a ripple-carry addition over whole recipe sets.
+
+        :param ingredient_ids: Ingredient ids
+        :type ingredient_ids: ``list``
+        :return: Bitsets of the count bits, least significant first
+        :rtype: ``list``
+        """
+        planes = []
+        for ingredient in set(ingredient_ids):
+            carry = self.bitsets.get(ingredient, 0)
+            for j, plane in enumerate(planes):
+                if not carry:
+                    break
+                planes[j], carry = plane ^ carry, plane & carry
+            if carry:
+                planes.append(carry)
+
+        return planes
+
+    def rank_by_coverage(self, ingredient_ids, limit=None, prefix=""):
+        """
+        Rank recipes by the share of their ingredients found in the given set.
+
+        With a limit, the ranking is read off the bitsets: recipes matching
+        ``m`` ingredients out of ``n`` are ``exactly m & size n``, so only
+        as many ``(m, n)`` groups as needed to fill the page are visited,
+        best coverage first, each already sorted by name.
+
+        :param ingredient_ids: Ingredient ids available
+        :type ingredient_ids: ``list``
+        :param limit: Maximum number of results, all when ``None``
+        :param prefix: Only rank recipes whose name starts with this
+        :type prefix: ``str``
+        :return: ``(recipe_id, matched, total)`` tuples, best coverage first
+        :rtype: ``list``
+        """
+        if limit is None:
+            return self._rank_all(ingredient_ids, prefix)
+
+        planes = self.match_counts(ingredient_ids)
+        if prefix:
+            mask = self._prefix_bits(prefix)
+            planes = [x & mask for x in planes]
+
+        matches = {}
+        for m in range(1, 1 << len(planes)):
+            bits = -1
+            for j, plane in enumerate(planes):
+                bits &= plane if m >> j & 1 else ~plane
+            if bits:
+                matches[m] = bits
+
+        groups = sorted(
+            ((m, n) for m in matches for n in self.size_bitsets),
+            key=lambda x: (-x[0] / x[1], -x[0])
+        )
+
+        ranking = []
+        for m, n in groups:
+            if len(ranking) >= limit:
+                break
+            bits = matches[m] & self.size_bitsets[n]
+            ranking += [(r, m, n) for r in self._first_ids(bits, limit - len(ranking))]
+
+        return ranking
+
+    def _rank_all(self, ingredient_ids, prefix):
+
+        matched = Counter()
+        for ingredient in set(ingredient_ids):
+            matched.update(self.postings.get(ingredient, ()))
+
+        candidates = matched.items()
+        if prefix:
+            candidates = [
+                x for x in candidates if self.recipe_names[x[0]].startswith(prefix)
+            ]
+
+        ranking = sorted(
+            candidates,
+            key=lambda x: (
+                -x[1] / self.recipe_sizes[x[0]],
+                -x[1],
+                self.recipe_names[x[0]]
+            )
+        )
+
+        return [(r, m, self.recipe_sizes[r]) for r, m in ranking]
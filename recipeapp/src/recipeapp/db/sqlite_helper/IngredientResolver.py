@@ -0,0 +1,167 @@
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+# Words counting or packaging an ingredient rather than naming it, as in
+# "3 cloves garlic" or "1 can coconut milk"
+MEASURE_WORDS = {
+    "bunch", "bunches", "can", "cans", "clove", "cloves", "handful", "handfuls",
+    "head", "heads", "jar", "jars", "package", "packages", "packet", "packets",
+    "piece", "pieces", "pinch", "sprig", "sprigs", "stick", "sticks", "tin", "tins",
+}
+
+
+def normalize(text):
+    """
+    Lower-case text and collapse punctuation, underscores and whitespace
+    runs into single spaces, so that "olive_oil" reads as "olive oil".
+
+    :param text: Free text
+    :type text: ``str``
+    :return: Normalized text
+    :rtype: ``str``
+    """
+    return " ".join(re.sub(r"[^\w\s'-]|_", " ", text.lower()).split())
+
+
+def trigrams(text):
+    padded = f"  {text}  "
+
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a, b, max_distance):
+    """
+    Edit distance between two strings, giving up past ``max_distance``.
+
+    :return: Distance, or ``max_distance + 1`` when it is exceeded
+    :rtype: ``int``
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb)
+            ))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+
+    return previous[-1]
+
+
+class IngredientResolver:
+    """
+    Resolve free-text ingredient names against the ingredient vocabulary.
+
+    Exact matches are a set lookup. Otherwise candidates sharing enough
+    trigrams with the query are checked with a bounded edit distance: ``k``
+    edits destroy at most ``3 * k`` of the query trigrams, so anything
+    sharing fewer can be skipped without computing the distance. A name
+    sharing ``t`` of the query's ``g`` trigrams shares one of any ``g - t +
+    1`` of them, so candidates are only looked up through the rarest
+    trigrams: most words in a phrase share none with any ingredient.
+    """
+
+    def __init__(self, vocabulary, max_distance=2, cache_size=4096):
+        """
+        :param vocabulary: Ingredient names
+        :param max_distance: Largest edit distance accepted for a match
+        :param cache_size: Number of resolved names kept in the cache
+        """
+        self.max_distance = max_distance
+
+        # Normalized name -> name as stored, which is what gets returned
+        self.names = {}
+        for name in sorted(x for x in vocabulary if x):
+            self.names.setdefault(normalize(name), name)
+        self.vocabulary = sorted(self.names)
+
+        # Longest phrase that can match, each edit splitting a word at most
+        self.max_words = max((len(x.split()) for x in self.vocabulary), default=0) + max_distance
+
+        self.max_length = max(map(len, self.vocabulary), default=0)
+        self.grams = [trigrams(x) for x in self.vocabulary]
+
+        self.index = defaultdict(list)
+        for i, grams in enumerate(self.grams):
+            for gram in grams:
+                self.index[gram].append(i)
+
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _resolve(self, name):
+        """
+        Return the closest ingredient to ``name``, or ``None``.
+        """
+        name = normalize(name)
+        if not name:
+            return None
+        if name in self.names:
+            return self.names[name]
+
+        max_distance = min(self.max_distance, len(name) // 3)
+        if not max_distance or len(name) > self.max_length + max_distance:
+            return None
+
+        grams = trigrams(name)
+        threshold = len(grams) - 3 * max_distance
+
+        postings = sorted((self.index.get(x, ()) for x in grams), key=len)
+        candidates = set()
+        for x in postings[:len(grams) - threshold + 1]:
+            candidates.update(x)
+
+        shared = []
+        for i in candidates:
+            if abs(len(self.vocabulary[i]) - len(name)) <= max_distance:
+                count = len(grams & self.grams[i])
+                if count >= threshold:
+                    shared.append((-count, i))
+        candidates = [i for _, i in sorted(shared)]
+
+        best, best_distance = None, max_distance + 1
+        for i in candidates:
+            distance = bounded_levenshtein(
+                name, self.vocabulary[i], best_distance - 1
+            )
+            if distance < best_distance:
+                best, best_distance = self.vocabulary[i], distance
+                if distance == 1:
+                    break
+
+        return self.names.get(best)
+
+    def resolve_phrase(self, text):
+        """
+        Find the ingredient named within a longer phrase, such as
+        "finely chopped red onions". Matches over more words win, exact or
+        fuzzy, then exact matches, then matches not made of a measure word
+        alone ("cloves" in "3 cloves garlic"), then the leftmost.
+
+        :param text: Free text ingredient description
+        :type text: ``str``
+        :return: Ingredient name, or ``None``
+        :rtype: ``str``
+        """
+        # Quantities left in the text are no part of a name
+        words = [x for x in normalize(text).split() if not x.isdigit()]
+
+        for n in range(min(len(words), self.max_words), 0, -1):
+            matches = []
+            for i in range(len(words) - n + 1):
+                window = " ".join(words[i:i + n])
+                exact = window in self.names
+                match = self.names[window] if exact else self.resolve(window)
+                if match:
+                    matches.append((not exact, window in MEASURE_WORDS, i, match))
+            if matches:
+                return min(matches)[-1]
+
+        return None
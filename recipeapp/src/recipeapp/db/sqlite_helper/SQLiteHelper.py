@@ -1,21 +1,151 @@
 __author__ = 'Alessandro Lusci'
 
+import codecs
+import json
 import sqlite3
+import zlib
+from pathlib import Path
+
+from recipeapp.db.sqlite_helper.IngredientIndex import IngredientIndex
+from recipeapp.db.sqlite_helper.IngredientResolver import IngredientResolver, normalize
+from recipeapp.units import UNITS, to_base
+
+# Folds case like SQLite's NOCASE collation, which only knows ASCII
+_NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def _nocase(text):
+
+    return text.translate(_NOCASE)
+
+
+# Recipes saved at once past which rebuilding the ingredient index is
+# cheaper than updating it recipe by recipe
+_INDEX_UPDATE_LIMIT = 100
 
 
 class SQLiteHelper:
-    def __init__(self, db_path):
-        self.conn = sqlite3.connect(db_path)
+    def __init__(self, db_path, read_only=False, check_same_thread=True):
+        """
+        :param db_path: Path of the SQLite database
+        :param read_only: Open the database read-only, without creating
+            missing tables
+        :param check_same_thread: Only allow the creating thread to use
+            the connection
+        """
+        if read_only:
+            self.conn = sqlite3.connect(
+                Path(db_path).resolve().as_uri() + "?mode=ro",
+                uri=True,
+                check_same_thread=check_same_thread
+            )
+        else:
+            self.conn = sqlite3.connect(
+                db_path, check_same_thread=check_same_thread
+            )
+            self.create_schema()
+
+        self._ingredient_index = None
+        self._ingredient_index_version = None
+        self._ingredient_lookup = None
+        self._ingredient_lookup_version = None
+
+    def create_schema(self):
+        """
+        Create tables and indexes missing from the database.
+        """
+        cur = self.conn.cursor()
+
+        cur.executescript("""
+        CREATE TABLE IF NOT EXISTS ingredient
+             (id INTEGER PRIMARY KEY,
+             name TEXT UNIQUE);
+        CREATE TABLE IF NOT EXISTS recipe
+             (id INTEGER PRIMARY KEY,
+             name TEXT UNIQUE,
+             instructions TEXT);
+        CREATE TABLE IF NOT EXISTS recipe_ingredient
+             (recipe INTEGER,
+             ingredient INTEGER,
+             quantity FLOAT,
+             unit TEXT,
+             FOREIGN KEY(recipe) REFERENCES recipe(id),
+             FOREIGN KEY(ingredient) REFERENCES ingredient(id));
+        CREATE TABLE IF NOT EXISTS recipe_instructions
+             (recipe INTEGER PRIMARY KEY,
+             codec TEXT,
+             data BLOB,
+             FOREIGN KEY(recipe) REFERENCES recipe(id));
+        CREATE TABLE IF NOT EXISTS unit
+             (name TEXT PRIMARY KEY,
+             dimension TEXT,
+             factor FLOAT);
+        CREATE INDEX IF NOT EXISTS recipe_ingredient_ingredient_idx
+             ON recipe_ingredient(ingredient, recipe);
+        CREATE INDEX IF NOT EXISTS recipe_ingredient_recipe_idx
+             ON recipe_ingredient(recipe);
+        CREATE INDEX IF NOT EXISTS recipe_name_nocase_idx
+             ON recipe(name COLLATE NOCASE, name);
+        """)
+
+        # Quantities are also stored in the base unit of their dimension,
+        # so carts can be summed without converting units. Databases made
+        # before these columns existed get them filled in once, here.
+        cur.execute("PRAGMA table_info(recipe_ingredient)")
+        columns = [row[1] for row in cur.fetchall()]
+        if "base_quantity" not in columns:
+            cur.execute("ALTER TABLE recipe_ingredient ADD COLUMN base_quantity FLOAT")
+            cur.execute("ALTER TABLE recipe_ingredient ADD COLUMN dimension TEXT")
+            self.migrate_units()
+
+        # Only written when out of date, so that opening an up to date
+        # database doesn't take the write lock
+        units = {(name, dimension, factor) for name, (_, dimension, factor) in UNITS.items()}
+        cur.execute("SELECT name, dimension, factor FROM unit")
+        if set(cur.fetchall()) != units:
+            cur.execute("DELETE FROM unit")
+            cur.executemany(
+                "INSERT INTO unit (name, dimension, factor) VALUES (?, ?, ?)", sorted(units)
+            )
+
+        self.conn.commit()
+
+    def migrate_units(self):
+        """
+        Fill in the base quantity and dimension of recipe ingredients
+        missing them. Rows with units not in ``UNITS`` are left alone.
+
+        :returns: Number of rows updated
+        :rtype: ``int``
+        """
+        cur = self.conn.cursor()
+
+        query = """
+                UPDATE recipe_ingredient
+                SET base_quantity = quantity * ?, dimension = ?
+                WHERE unit IS ? AND dimension IS NULL;
+                """
+
+        updated = 0
+        cur.execute("SELECT DISTINCT unit FROM recipe_ingredient WHERE dimension IS NULL")
+        for unit in [row[0] for row in cur.fetchall()]:
+            if unit is None or unit in UNITS:
+                _, dimension, factor = UNITS[unit or ""]
+                cur.execute(query, (factor, dimension, unit))
+                updated += cur.rowcount
+        self.conn.commit()
+
+        return updated
 
     def get_ingredient_id(self, ingredient_name):
         cur = self.conn.cursor()
 
         query = """
-        SELECT * FROM ingredient
-        WHERE name = '{0}';
-        """.format(ingredient_name)
+        SELECT id FROM ingredient
+        WHERE name = ?;
+        """
 
-        cur.execute(query)
+        cur.execute(query, (ingredient_name,))
         rows = cur.fetchall()
 
         if rows:
@@ -25,15 +155,15 @@ class SQLiteHelper:
         cur = self.conn.cursor()
 
         query = """
-         SELECT * FROM ingredient
-         WHERE id = {0};
-         """.format(id)
+         SELECT name FROM ingredient
+         WHERE id = ?;
+         """
 
-        cur.execute(query)
+        cur.execute(query, (id,))
         rows = cur.fetchall()
 
         if rows:
-            return rows[0][1]
+            return rows[0][0]
 
     def get_all_ingredients(self):
         """
@@ -44,95 +174,336 @@ class SQLiteHelper:
         """
         cur = self.conn.cursor()
 
-        query = "SELECT * FROM ingredient"
+        query = "SELECT id, name FROM ingredient"
 
         cur.execute(query)
         rows = cur.fetchall()
 
         return rows
 
-    def get_recipe_id(self, recipe_name):
+    def get_ingredient_resolver(self):
+        """
+        Returns a fuzzy resolver over the ingredient vocabulary.
+
+        :returns: Ingredient resolver
+        :rtype: ``IngredientResolver``
+        """
+        return IngredientResolver(x[1] for x in self.get_all_ingredients())
+
+    def search_ingredients(self, text, limit=None):
+        """
+        Returns ingredient names containing the given text.
+
+        :param text: Text to look for
+        :type text: ``str``
+        :param limit: Maximum number of names returned, all when ``None``
+        :returns: Sorted ingredient names
+        :rtype: ``list``
+        """
         cur = self.conn.cursor()
 
-        recipe_name = recipe_name.replace("'", "''")
+        pattern = "%{0}%".format(
+            text.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
 
         query = """
-        SELECT * FROM recipe
-        WHERE name = '{0}';
-        """.format(recipe_name)
+                SELECT name FROM ingredient
+                WHERE name LIKE ? ESCAPE '\\'
+                ORDER BY name
+                LIMIT ?;
+                """
 
-        cur.execute(query)
+        cur.execute(query, (pattern, -1 if limit is None else limit))
+
+        return [row[0] for row in cur.fetchall()]
+
+    def get_recipe_id(self, recipe_name):
+        cur = self.conn.cursor()
+
+        query = """
+        SELECT id FROM recipe
+        WHERE name = ?;
+        """
+
+        cur.execute(query, (recipe_name,))
         rows = cur.fetchall()
 
         if rows:
             return rows[0][0]
 
-    def add_recipe(self, name, ingredient):
+    def get_recipe_ids(self, recipe_names):
+        """
+        Returns the ids of the given recipes, in the same order and
+        repeated for names listed more than once. Unknown names are skipped.
+
+        :param recipe_names: Recipe names
+        :type recipe_names: ``list``
+        :returns: Recipe ids
+        :rtype: ``list``
+        """
+        cur = self.conn.cursor()
+
+        query = """
+                SELECT r.id FROM json_each(?) j
+                JOIN recipe r ON r.name = j.value
+                ORDER BY j.key;
+                """
+
+        cur.execute(query, (json.dumps(list(recipe_names)),))
+
+        return [row[0] for row in cur.fetchall()]
+
+    def add_recipe(self, name, ingredient, instructions=None):
         cur = self.conn.cursor()
 
+        # Check ingredients exist before writing anything
+        ingredient_ids = [self.get_ingredient_id(x["name"]) for x in ingredient]
+        unknown = [x["name"] for x, i in zip(ingredient, ingredient_ids) if i is None]
+        if unknown:
+            print("Unknown ingredients: {0}".format(", ".join(unknown)))
+            return False
+        unknown = sorted({x["unit"] for x in ingredient if x["unit"] not in UNITS})
+        if unknown:
+            print("Unknown units: {0}".format(", ".join(map(str, unknown))))
+            return False
+
+        # The index is only put back once the recipe is fully written
+        index, self._ingredient_index = self._ingredient_index, None
+
         # Add recipe
         query = """
         INSERT INTO recipe
-        (name) VALUES ('{0}');
-        """.format(name)
+        (name) VALUES (?);
+        """
         try:
-            cur.execute(query)
+            cur.execute(query, (name,))
             self.conn.commit()
         except sqlite3.IntegrityError as e:
             print(e)
+            self.conn.rollback()
+            self._ingredient_index = index
             return False
 
-        # Get recipe and ingredient ids
-        recipe_id = self.get_recipe_id(name)
+        recipe_id = cur.lastrowid
 
         # Add ingredients
-        for elem in ingredient:
-            ingredient_id = self.get_ingredient_id(elem["name"])
+        for elem, ingredient_id in zip(ingredient, ingredient_ids):
             query = """
             INSERT INTO recipe_ingredient
-            (recipe, ingredient, quantity, unit) 
-            VALUES ({0},{1},{2},'{3}');
-            """.format(recipe_id, ingredient_id, elem['quantity'],
-                       elem['unit'])
+            (recipe, ingredient, quantity, unit, base_quantity, dimension)
+            VALUES (?, ?, ?, ?, ?, ?);
+            """
             try:
-                cur.execute(query)
+                # Quantities typed in the app are Decimals, unknown to sqlite3
+                cur.execute(query, (
+                    recipe_id, ingredient_id, float(elem['quantity']), elem['unit'],
+                    *to_base(elem['quantity'], elem['unit'])
+                ))
                 self.conn.commit()
             except sqlite3.IntegrityError as e:
                 print(e)
                 return False
 
+        self._update_ingredient_index(index, added=[(recipe_id, name, ingredient_ids)])
+
+        if instructions:
+            return self.set_recipe_instructions(name, instructions)
+
         return True
 
+    def add_recipes(self, recipes):
+        """
+        Add many recipes in a single transaction. Recipes whose name is
+        already used or with unknown ingredients or units are skipped.
+
+        :param recipes: Recipes as ``{"name": ..., "ingredients": [...],
+            "instructions": ...}`` dictionaries, ingredients as accepted by
+            ``add_recipe``
+        :type recipes: ``list``
+        :returns: Number of recipes added
+        :rtype: ``int``
+        """
+        cur = self.conn.cursor()
+
+        cur.execute("SELECT name, id FROM ingredient")
+        ingredient_ids = dict(cur.fetchall())
+
+        index, self._ingredient_index = self._ingredient_index, None
+
+        added = []
+        with self.conn:
+            for recipe in recipes:
+                ingredients = recipe["ingredients"]
+                if any(x["name"] not in ingredient_ids or x["unit"] not in UNITS
+                       for x in ingredients):
+                    continue
+
+                cur.execute(
+                    "INSERT OR IGNORE INTO recipe (name) VALUES (?);",
+                    (recipe["name"],)
+                )
+                if not cur.rowcount:
+                    continue
+                recipe_id = cur.lastrowid
+
+                query = """
+                        INSERT INTO recipe_ingredient
+                        (recipe, ingredient, quantity, unit, base_quantity, dimension)
+                        VALUES (?, ?, ?, ?, ?, ?);
+                        """
+                cur.executemany(query, [
+                    (recipe_id, ingredient_ids[x["name"]], float(x["quantity"]), x["unit"],
+                     *to_base(x["quantity"], x["unit"]))
+                    for x in ingredients
+                ])
+
+                if recipe.get("instructions"):
+                    self._insert_instructions(cur, recipe_id, recipe["instructions"])
+
+                added.append((
+                    recipe_id, recipe["name"], [ingredient_ids[x["name"]] for x in ingredients]
+                ))
+
+        self._update_ingredient_index(index, added=added)
+
+        return len(added)
+
     def delete_recipe(self, name):
         cur = self.conn.cursor()
         recipe_id = self.get_recipe_id(name)
+        index, self._ingredient_index = self._ingredient_index, None
 
-        # Delete ingredients
-        query = """
-                DELETE FROM recipe_ingredient
-                WHERE recipe = {0};
-                """.format(recipe_id)
-        try:
-            cur.execute(query)
-            self.conn.commit()
-        except sqlite3.IntegrityError as e:
-            print(e)
-            return False
+        # Delete ingredients and instructions
+        for table in ["recipe_ingredient", "recipe_instructions"]:
+            query = """
+                    DELETE FROM {0}
+                    WHERE recipe = ?;
+                    """.format(table)
+            try:
+                cur.execute(query, (recipe_id,))
+                self.conn.commit()
+            except sqlite3.IntegrityError as e:
+                print(e)
+                return False
 
         # Delete recipe
         query = """
                 DELETE FROM recipe
-                WHERE name = '{0}';
-                """.format(name)
+                WHERE name = ?;
+                """
         try:
-            cur.execute(query)
+            cur.execute(query, (name,))
             self.conn.commit()
         except sqlite3.IntegrityError as e:
             print(e)
             return False
 
+        self._update_ingredient_index(index, removed=[recipe_id])
+
+        return True
+
+    def set_recipe_instructions(self, name, instructions):
+        """
+        Store the instructions of a recipe, zlib-compressed in the
+        ``recipe_instructions`` side table so that queries on ``recipe``
+        never carry them. Empty instructions remove the stored ones.
+
+        :param name: Recipe name
+        :type name: ``str``
+        :param instructions: Instructions text
+        :type instructions: ``str``
+        :returns: Whether the recipe exists
+        :rtype: ``bool``
+        """
+        cur = self.conn.cursor()
+        recipe_id = self.get_recipe_id(name)
+
+        if recipe_id is None:
+            return False
+
+        if instructions:
+            self._insert_instructions(cur, recipe_id, instructions)
+        else:
+            query = """
+                    DELETE FROM recipe_instructions
+                    WHERE recipe = ?;
+                    """
+            cur.execute(query, (recipe_id,))
+        self.conn.commit()
+
         return True
 
+    def _insert_instructions(self, cur, recipe_id, instructions):
+        query = """
+                INSERT OR REPLACE INTO recipe_instructions
+                (recipe, codec, data) VALUES (?, 'zlib', ?);
+                """
+        cur.execute(query, (recipe_id, zlib.compress(instructions.encode(), 9)))
+
+    def iter_recipe_instructions(self, name, chunk_size=16384):
+        """
+        Yields the instructions of a recipe a piece at a time, reading and
+        decompressing the stored blob incrementally.
+
+        :param name: Recipe name
+        :type name: ``str``
+        :param chunk_size: Number of compressed bytes read at a time
+        :type chunk_size: ``int``
+        :returns: Instructions text chunks, none when there are no instructions
+        :rtype: ``generator``
+        """
+        cur = self.conn.cursor()
+
+        query = """
+                SELECT r.id, ri.codec FROM recipe r
+                JOIN recipe_instructions ri ON ri.recipe = r.id
+                WHERE r.name = ?;
+                """
+        cur.execute(query, (name,))
+        row = cur.fetchone()
+
+        if row is None:
+            return
+
+        recipe_id, codec = row
+        if codec != "zlib":
+            raise ValueError("Unsupported instructions codec: {0}".format(codec))
+
+        decompressor = zlib.decompressobj()
+        decoder = codecs.getincrementaldecoder("utf-8")()
+
+        if hasattr(self.conn, "blobopen"):
+            with self.conn.blobopen(
+                "recipe_instructions", "data", recipe_id, readonly=True
+            ) as blob:
+                chunks = iter(lambda: blob.read(chunk_size), b"")
+                for chunk in chunks:
+                    yield decoder.decode(decompressor.decompress(chunk))
+        else:
+            # Python < 3.11 has no incremental blob I/O
+            query = """
+                    SELECT data FROM recipe_instructions
+                    WHERE recipe = ?;
+                    """
+            cur.execute(query, (recipe_id,))
+            yield decoder.decode(decompressor.decompress(cur.fetchone()[0]))
+
+        yield decoder.decode(decompressor.flush(), final=True)
+
+    def get_recipe_instructions(self, name):
+        """
+        Returns the instructions of a recipe.
+
+        :param name: Recipe name
+        :type name: ``str``
+        :returns: Instructions text, ``None`` when there are none
+        :rtype: ``str``
+        """
+        chunks = list(self.iter_recipe_instructions(name))
+
+        if chunks:
+            return "".join(chunks)
+
     def get_recipes(self):
         cur = self.conn.cursor()
 
@@ -145,22 +516,307 @@ class SQLiteHelper:
         if rows:
             return rows
 
+    def get_recipes_page(self, after=None, prefix="", limit=50):
+        """
+        Returns a page of recipe names, sorted ignoring case.
+
+        Pages are keyset paginated: pass the last name of a page as
+        ``after`` to get the next one. Every page is a seek in the
+        ``recipe_name_nocase_idx`` index, however deep into the list.
+
+        :param after: Last name of the previous page, ``None`` for the first
+        :type after: ``str``
+        :param prefix: Only return names starting with this, ignoring case
+        :type prefix: ``str``
+        :param limit: Page size
+        :type limit: ``int``
+        :returns: Recipe names
+        :rtype: ``list``
+        """
+        cur = self.conn.cursor()
+
+        conditions = []
+        params = []
+        if prefix:
+            # SQLite seeks on one lower bound only, so the prefix one is
+            # left out when the page starts after it
+            if after is None or _nocase(after) < _nocase(prefix):
+                conditions.append("name COLLATE NOCASE >= ?")
+                params.append(prefix)
+            conditions.append("name COLLATE NOCASE < ?")
+            params.append(prefix + "\U0010ffff")
+        if after is not None:
+            conditions.append(
+                "name COLLATE NOCASE >= ? "
+                "AND (name COLLATE NOCASE > ? OR name > ?)"
+            )
+            params += [after, after, after]
+
+        query = """
+                SELECT name FROM recipe
+                {0}
+                ORDER BY name COLLATE NOCASE, name
+                LIMIT ?;
+                """.format(
+                    "WHERE " + " AND ".join(conditions) if conditions else ""
+                )
+
+        cur.execute(query, params + [limit])
+
+        return [row[0] for row in cur.fetchall()]
+
     def get_recipe_ingredients(self, name):
         cur = self.conn.cursor()
         recipe_id = self.get_recipe_id(name)
 
         query = """
-                SELECT * FROM recipe_ingredient
-                WHERE recipe = {0};
-                """.format(recipe_id)
+                SELECT i.name, ri.quantity, ri.unit
+                FROM recipe_ingredient ri
+                JOIN ingredient i ON i.id = ri.ingredient
+                WHERE ri.recipe = ?;
+                """
 
-        cur.execute(query)
+        cur.execute(query, (recipe_id,))
         rows = cur.fetchall()
 
         ingredients = []
         for row in rows:
-            ingredients.append({"name": self.get_ingredient(row[1]),
-                                "quantity": row[2],
-                                "unit": row[3]})
+            ingredients.append({"name": row[0],
+                                "quantity": row[1],
+                                "unit": row[2]})
 
         return ingredients
+
+    def get_cart_rows(self, recipe_names):
+        """
+        Returns the ingredient rows of the given recipes, repeated for
+        recipes listed more than once.
+
+        :param recipe_names: Recipe names
+        :type recipe_names: ``list``
+        :returns: ``(ingredient id, ingredient name, quantity, unit)`` tuples
+        :rtype: ``list``
+        """
+        cur = self.conn.cursor()
+
+        query = """
+                SELECT ri.ingredient, i.name, ri.quantity, ri.unit
+                FROM recipe_ingredient ri
+                JOIN ingredient i ON i.id = ri.ingredient
+                WHERE ri.recipe = ?;
+                """
+
+        recipe_rows = {}
+        rows = []
+        for name in recipe_names:
+            if name not in recipe_rows:
+                cur.execute(query, (self.get_recipe_id(name),))
+                recipe_rows[name] = cur.fetchall()
+            rows.extend(recipe_rows[name])
+
+        return rows
+
+    def compute_cart(self, recipe_ids):
+        """
+        Aggregates the ingredients of the given recipes inside SQLite,
+        repeating recipes listed more than once.
+
+        Base quantities are summed per ingredient and dimension, then
+        converted back to the unit used most often for them, ties going
+        to the unit seen first. Rows left by older versions with units not
+        in ``UNITS`` can't be converted: their quantities are summed per
+        unit as stored and returned with a ``None`` dimension. Ingredients
+        measured in any dimension come first, then counted-only ones, each
+        in the order first seen.
+
+        :param recipe_ids: Recipe ids
+        :type recipe_ids: ``list``
+        :returns: ``(ingredient id, ingredient name, dimension, quantity,
+            unit)`` tuples
+        :rtype: ``list``
+        """
+        cur = self.conn.cursor()
+
+        # Rows are grouped per unit in a single pass over recipe_ingredient,
+        # everything after that works on the much smaller grouped rows.
+        # Rows are ordered by (position in the selection, rowid), packed in
+        # one integer.
+        query = """
+                WITH selected AS (
+                    SELECT value AS recipe, COUNT(*) AS times,
+                           MIN(CAST(key AS INTEGER)) AS position
+                    FROM json_each(?)
+                    GROUP BY value
+                ),
+                unit_use AS (
+                    SELECT ri.ingredient, ri.dimension, ri.unit,
+                           SUM(s.times) AS uses,
+                           SUM(COALESCE(ri.base_quantity, ri.quantity) * s.times)
+                               AS base_quantity,
+                           MIN(s.position * (SELECT MAX(rowid) + 1 FROM recipe_ingredient)
+                               + ri.rowid) AS seen
+                    FROM selected s
+                    JOIN recipe_ingredient ri ON ri.recipe = s.recipe
+                    GROUP BY ri.ingredient, ri.dimension, ri.unit
+                ),
+                total AS (
+                    SELECT ingredient, dimension,
+                           CASE WHEN dimension IS NULL THEN unit END AS unit,
+                           SUM(base_quantity) AS base_quantity,
+                           MIN(seen) AS seen
+                    FROM unit_use
+                    GROUP BY ingredient, dimension,
+                             CASE WHEN dimension IS NULL THEN unit END
+                ),
+                display_unit AS (
+                    SELECT ingredient, dimension, unit,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY ingredient, dimension
+                               ORDER BY uses DESC, seen
+                           ) AS rank
+                    FROM unit_use
+                    WHERE dimension != 'count'
+                )
+                SELECT t.ingredient, i.name, t.dimension,
+                       t.base_quantity / COALESCE(u.factor, 1),
+                       COALESCE(d.unit, t.unit)
+                FROM total t
+                JOIN ingredient i ON i.id = t.ingredient
+                LEFT JOIN display_unit d ON d.ingredient = t.ingredient
+                     AND d.dimension = t.dimension AND d.rank = 1
+                LEFT JOIN unit u ON u.name = d.unit
+                ORDER BY
+                    MIN(CASE WHEN t.dimension IS NOT 'count' THEN t.seen END)
+                        OVER (PARTITION BY t.ingredient) IS NULL,
+                    MIN(CASE WHEN t.dimension IS NOT 'count' THEN t.seen END)
+                        OVER (PARTITION BY t.ingredient),
+                    t.seen;
+                """
+
+        cur.execute(query, (json.dumps(list(recipe_ids)),))
+
+        return cur.fetchall()
+
+    def get_ingredient_index(self):
+        """
+        Returns the in-memory ingredient to recipe index, building it on
+        first use. Recipes saved or deleted through this helper update it in
+        place of a rebuild; it is rebuilt when another connection changed
+        the database.
+
+        :returns: Ingredient index
+        :rtype: ``IngredientIndex``
+        """
+        cur = self.conn.cursor()
+
+        cur.execute("PRAGMA data_version")
+        version = cur.fetchone()[0]
+        if version != self._ingredient_index_version:
+            self._ingredient_index = None
+
+        if self._ingredient_index is None:
+            self._ingredient_index_version = version
+
+            cur.execute("SELECT id, name FROM recipe")
+            recipe_names = dict(cur.fetchall())
+
+            query = """
+                    SELECT ingredient, recipe FROM recipe_ingredient
+                    ORDER BY ingredient, recipe
+                    """
+            cur.execute(query)
+
+            self._ingredient_index = IngredientIndex(cur, recipe_names)
+
+        return self._ingredient_index
+
+    def _update_ingredient_index(self, index, added=(), removed=()):
+        """
+        Apply recipes saved or deleted through this helper to the
+        ingredient index, when one is built. Changes made through other
+        connections are caught by ``get_ingredient_index`` instead.
+
+        :param index: Index from before the change
+        :param added: ``(recipe id, name, ingredient ids)`` tuples
+        :param removed: Recipe ids
+        """
+        if index is None or len(added) > _INDEX_UPDATE_LIMIT:
+            return
+
+        if removed:
+            index = index.without_recipes(removed)
+        if added:
+            index = index.with_recipes(added)
+
+        self._ingredient_index = index
+
+    def get_ingredient_ids(self, ingredient_names):
+        """
+        Returns the ids of the given ingredients, skipping unknown names.
+        Names are compared normalized, so "Olive oil" finds "olive_oil".
+
+        :param ingredient_names: Ingredient names
+        :type ingredient_names: ``list``
+        :returns: Ingredient ids
+        :rtype: ``list``
+        """
+        cur = self.conn.cursor()
+
+        # Rebuilt after any change, through this connection or another one
+        cur.execute("PRAGMA data_version")
+        version = (cur.fetchone()[0], self.conn.total_changes)
+        if version != self._ingredient_lookup_version:
+            self._ingredient_lookup_version = version
+            self._ingredient_lookup = {}
+            for ingredient_id, name in sorted(self.get_all_ingredients(), key=lambda x: x[1]):
+                if name:
+                    self._ingredient_lookup.setdefault(normalize(name), ingredient_id)
+
+        ids = (self._ingredient_lookup.get(normalize(x)) for x in set(ingredient_names))
+
+        return list({x for x in ids if x is not None})
+
+    def get_recipes_with_ingredients(self, ingredient_names, index=None):
+        """
+        Returns the recipes using all of the given ingredients.
+
+        :param ingredient_names: Ingredient names
+        :type ingredient_names: ``list``
+        :param index: Ingredient index to use, this helper's own when ``None``
+        :returns: Sorted recipe names
+        :rtype: ``list``
+        """
+        names = {normalize(x) for x in ingredient_names}
+        ingredient_ids = self.get_ingredient_ids(names)
+        if len(ingredient_ids) < len(names):
+            return []
+
+        if index is None:
+            index = self.get_ingredient_index()
+
+        return sorted(
+            index.recipe_names[x] for x in index.recipes_with_all(ingredient_ids)
+        )
+
+    def rank_recipes_by_coverage(self, ingredient_names, limit=None, prefix="", index=None):
+        """
+        Returns the recipes using any of the given ingredients, ranked by
+        the fraction of their ingredients covered.
+
+        :param ingredient_names: Ingredient names available
+        :type ingredient_names: ``list``
+        :param limit: Maximum number of recipes returned, all when ``None``
+        :param prefix: Only return recipes whose name starts with this
+        :type prefix: ``str``
+        :param index: Ingredient index to use, this helper's own when ``None``
+        :returns: ``(name, matched, total)`` tuples, best coverage first
+        :rtype: ``list``
+        """
+        ingredient_ids = self.get_ingredient_ids(ingredient_names)
+        if index is None:
+            index = self.get_ingredient_index()
+
+        return [
+            (index.recipe_names[r], matched, total)
+            for r, matched, total in index.rank_by_coverage(ingredient_ids, limit, prefix)
+        ]
@@ -0,0 +1,76 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+from recipeapp.db.sqlite_helper.SQLiteHelper import SQLiteHelper
+
+
+class SQLiteHelperPool:
+    """
+    Thread-safe access to one recipe database.
+
+    Reads are spread over a fixed set of read-only helpers. Writes all go
+    through a single helper, one at a time, matching SQLite's single
+    writer. The database is switched to WAL journaling so readers keep
+    going while a write is in progress.
+
+    Readers share the writing helper's ingredient index, which it updates
+    as recipes are saved, instead of each building their own.
+    """
+
+    def __init__(self, db_path, readers=4):
+        """
+        :param db_path: Path of the SQLite database
+        :param readers: Number of read-only connections
+        """
+        self._writer = SQLiteHelper(db_path, check_same_thread=False)
+        self._writer.conn.execute("PRAGMA journal_mode=WAL")
+        self._write_lock = threading.Lock()
+
+        # Built up front: a build holds up writes, see get_ingredient_index
+        self._writer.get_ingredient_index()
+
+        self._readers = queue.Queue()
+        for _ in range(readers):
+            self._readers.put(
+                SQLiteHelper(db_path, read_only=True, check_same_thread=False)
+            )
+
+    @contextmanager
+    def reader(self):
+        """
+        Borrow a read-only helper, waiting for one to be free.
+        """
+        helper = self._readers.get()
+        try:
+            yield helper
+        finally:
+            self._readers.put(helper)
+
+    def get_ingredient_index(self):
+        """
+        Returns the ingredient index shared by the readers. It is rebuilt
+        here, holding up writes, when another connection changed the
+        database, so call it before borrowing a reader rather than while
+        holding one.
+
+        :returns: Ingredient index, not modified once returned
+        :rtype: ``IngredientIndex``
+        """
+        with self._write_lock:
+            return self._writer.get_ingredient_index()
+
+    @contextmanager
+    def writer(self):
+        """
+        Hold the writing helper exclusively.
+        """
+        with self._write_lock:
+            yield self._writer
+
+    def close(self):
+        while not self._readers.empty():
+            self._readers.get_nowait().conn.close()
+
+        with self._write_lock:
+            self._writer.conn.close()
@@ -0,0 +1,168 @@
+import datetime
+import threading
+
+SCOPES = ['https://www.googleapis.com/auth/drive']
+
+
+class DriveAuthManager:
+    """
+    Owns the one Google credentials object shared by all Drive operations.
+
+    Nothing happens on construction: cached credentials are read from the
+    token file, or the user is asked to log in, on the first
+    ``get_credentials`` call. Once credentials exist, ``start`` keeps them
+    fresh on a background thread, refreshing the access token
+    ``refresh_margin`` seconds before it expires so Drive calls don't wait
+    on a refresh.
+    """
+
+    def __init__(self, creds_path: str, token_path: str, scopes: list = SCOPES,
+                 refresh_margin: float = 300, retry_interval: float = 30):
+        """
+        :param creds_path: OAuth client secrets file, used when the user
+            has to log in
+        :param token_path: File caching the user's access and refresh tokens
+        :param scopes: OAuth scopes requested
+        :param refresh_margin: Seconds before expiry to refresh the token
+        :param retry_interval: Seconds to wait after a failed refresh
+        """
+        self.creds_path = creds_path
+        self.token_path = token_path
+        self.scopes = scopes
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+
+        self._creds = None
+        # _lock only guards attributes and is never held during network
+        # I/O or the login flow. _load_lock and _refresh_lock make sure a
+        # single thread logs in or refreshes at a time.
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get_credentials(self):
+        """
+        Return valid credentials, loading or refreshing them if needed.
+
+        :return: Google credentials
+        :rtype: `google.oauth2.credentials.Credentials`
+        """
+        with self._lock:
+            creds = self._creds
+
+        if creds is None:
+            with self._load_lock:
+                with self._lock:
+                    creds = self._creds
+                if creds is None:
+                    creds = self._load()
+                    with self._lock:
+                        self._creds = creds
+
+        if not creds.valid:
+            self._refresh(creds, lambda: not creds.valid)
+
+        return creds
+
+    def _load(self):
+        from google.oauth2.credentials import Credentials
+
+        try:
+            creds = Credentials.from_authorized_user_file(self.token_path, self.scopes)
+        except Exception as e:
+            print("Error loading credentials:", e)
+            creds = None
+
+        # If there are no (valid) credentials that can be refreshed, let the
+        # user log in
+        if not creds or (not creds.valid and not creds.refresh_token):
+            from google_auth_oauthlib.flow import InstalledAppFlow
+
+            flow = InstalledAppFlow.from_client_secrets_file(
+                self.creds_path, self.scopes)
+            creds = flow.run_local_server(port=0)
+            self._save(creds)
+
+        return creds
+
+    def _refresh(self, creds, needed):
+        """
+        Refresh ``creds`` unless another thread did while this one waited.
+
+        :param needed: Returns whether the refresh is still needed
+        """
+        from google.auth.transport.requests import Request
+
+        with self._refresh_lock:
+            if needed():
+                creds.refresh(Request())
+                self._save(creds)
+
+    def _save(self, creds):
+        with open(self.token_path, "w") as token:
+            token.write(creds.to_json())
+
+    def seconds_until_refresh(self) -> float:
+        """
+        Seconds until the token is due for a refresh, ``None`` when the
+        credentials are not loaded yet or don't expire.
+        """
+        with self._lock:
+            creds = self._creds
+
+        if creds is None or creds.expiry is None:
+            return None
+
+        # google-auth keeps expiry as a naive UTC datetime
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+        return (creds.expiry - now).total_seconds() - self.refresh_margin
+
+    def start(self):
+        """
+        Keep the loaded credentials fresh on a daemon thread. Does nothing
+        until credentials are loaded, or when the thread already runs.
+        """
+        with self._lock:
+            if self._creds is None:
+                return
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="drive-token-refresh", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        from google.auth.exceptions import RefreshError
+
+        with self._lock:
+            creds = self._creds
+
+        while not self._stop.is_set():
+            wait = self.retry_interval
+            try:
+                remaining = self.seconds_until_refresh()
+                if remaining is not None and remaining <= 0:
+                    self._refresh(creds, lambda: self.seconds_until_refresh() <= 0)
+                    remaining = self.seconds_until_refresh()
+                if remaining is None:
+                    return
+                wait = max(remaining, 1)
+            except RefreshError as e:
+                # The refresh token was revoked or expired: retrying won't
+                # help, the next get_credentials call reports the error
+                print("Error refreshing credentials:", e)
+                if not getattr(e, "retryable", False):
+                    return
+            except Exception as e:
+                print("Error refreshing credentials:", e)
+
+            self._stop.wait(wait)
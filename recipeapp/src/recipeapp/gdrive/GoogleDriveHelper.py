@@ -1,49 +1,47 @@
 import os
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+
+from recipeapp.gdrive.DriveAuthManager import DriveAuthManager
+
+# The Google client libraries take a long time to import, so they are
+# imported by the methods using them rather than at module import.
 
 
 class GoogleDriveHelper:
 
-    def __init__(self, creds_path: str, token_path: str):
-
-        self.creds = self.authenticate(creds_path, token_path)
-
-    def authenticate(self, creds_path: str, token_path: str):
-        
-        SCOPES = ['https://www.googleapis.com/auth/drive']
-        creds = None
-
-        # The file token.json stores the user's access and refresh tokens, and is
-        # created automatically when the authorization flow completes for the first time.
-        try:
-            creds = Credentials.from_authorized_user_file(token_path, SCOPES)
-        except Exception as e:
-            print("Error loading credentials:", e)
-
-        # If there are no (valid) credentials available, let the user log in.
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    creds_path, SCOPES)
-                creds = flow.run_local_server(port=0)
-            
-            # Save the credentials for the next run
-            with open(token_path, "w") as token:
-                token.write(creds.to_json())
-            
+    def __init__(self, creds_path: str, token_path: str, auth: DriveAuthManager = None):
+        """
+        :param creds_path: OAuth client secrets file
+        :param token_path: File caching the user's tokens
+        :param auth: Credentials manager to share, one is created if unset
+        """
+        self.auth = auth or DriveAuthManager(creds_path, token_path)
+        self._drive_service = None
+
+    @property
+    def creds(self):
+
+        creds = self.auth.get_credentials()
+        # Keep them fresh from now on
+        self.auth.start()
+
         return creds
 
+    def get_drive_service(self):
+        """
+        Return the Drive API client, built once and shared by all calls.
+        It holds the manager's credentials object, so background refreshes
+        apply to it.
+        """
+        from googleapiclient.discovery import build
+
+        if self._drive_service is None:
+            self._drive_service = build("drive", "v3", credentials=self.creds)
+
+        return self._drive_service
 
     def get_or_create_folder(self, folder_name):
 
-        # Authenticate with Google Drive API
-        drive_service = build("drive", "v3", credentials=self.creds)
+        drive_service = self.get_drive_service()
 
         # Search for the folder by name
         response = drive_service.files().list(
@@ -68,8 +66,9 @@ class GoogleDriveHelper:
 
 
     def upload_csv_to_google_drive(self, file_path, folder_id=None):
+        from googleapiclient.http import MediaFileUpload
 
-        drive_service = build("drive", "v3", credentials=self.creds)
+        drive_service = self.get_drive_service()
 
         file_metadata = {
             "name": os.path.basename(file_path),
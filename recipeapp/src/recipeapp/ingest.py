@@ -0,0 +1,363 @@
+"""
+Offline ingestion of scraped recipe corpora
+
+    python -m recipeapp.ingest corpus.jsonl pages/ --db recipe.db --workers 8
+
+Inputs are JSONL files (one recipe object per line) and HTML pages carrying
+schema.org ``Recipe`` JSON-LD, or directories of them. Ingredient lines are
+parsed into quantity, unit and ingredient name in a process pool; the
+parsed recipes stream back in order to this process, which is the only
+writer and inserts them in batches.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from html.parser import HTMLParser
+
+from recipeapp.db.sqlite_helper.IngredientResolver import IngredientResolver
+from recipeapp.db.sqlite_helper.SQLiteHelper import SQLiteHelper
+from recipeapp.units import UNITS
+from recipeapp.utils import map_in_pool
+
+# Unit spellings -> (unit name, factor to that unit). Metric units and
+# teaspoons are converted to the closest unit the app knows.
+UNIT_ALIASES = {
+    "tbs": ("tbs", 1), "tbsp": ("tbs", 1), "tablespoon": ("tbs", 1),
+    "tsp": ("tbs", 1 / 3), "teaspoon": ("tbs", 1 / 3),
+    "fl oz": ("fl oz", 1), "fl. oz": ("fl oz", 1), "fluid ounce": ("fl oz", 1),
+    "gill": ("gill", 1),
+    "cup": ("cup", 1), "c": ("cup", 1),
+    "pt": ("pt", 1), "pint": ("pt", 1),
+    "qt": ("qt", 1), "quart": ("qt", 1),
+    "gal": ("gal", 1), "gallon": ("gal", 1),
+    "lb": ("lb", 1), "pound": ("lb", 1),
+    "oz": ("oz", 1), "ounce": ("oz", 1),
+    "ml": ("fl oz", 1 / UNITS["fl oz"][2]),
+    "l": ("qt", 1000 / UNITS["qt"][2]), "liter": ("qt", 1000 / UNITS["qt"][2]),
+    "litre": ("qt", 1000 / UNITS["qt"][2]),
+    "g": ("oz", 1 / UNITS["oz"][2]), "gram": ("oz", 1 / UNITS["oz"][2]),
+    "kg": ("lb", 1000 / UNITS["lb"][2]),
+    "kilogram": ("lb", 1000 / UNITS["lb"][2]),
+}
+
+UNIT_LOOKUP = {re.sub(r"[\s.]", "", k): v for k, v in UNIT_ALIASES.items()}
+
+UNIT_PATTERN = re.compile(
+    r"(%s)(?:e?s)?\.?(?=\W|$)" % "|".join(
+        re.escape(x).replace(r"\ ", r"\s*")
+        for x in sorted(UNIT_ALIASES, key=len, reverse=True)
+    ),
+    re.IGNORECASE
+)
+
+UNICODE_FRACTIONS = {
+    "½": 1 / 2, "⅓": 1 / 3, "⅔": 2 / 3, "¼": 1 / 4, "¾": 3 / 4,
+    "⅛": 1 / 8, "⅜": 3 / 8, "⅝": 5 / 8, "⅞": 7 / 8,
+}
+
+QUANTITY_PATTERNS = [
+    (re.compile(r"(\d+)\s+(\d+)\s*/\s*(\d+)"),
+     lambda m: int(m[1]) + int(m[2]) / max(int(m[3]), 1)),
+    (re.compile(r"(\d+)\s*/\s*(\d+)"),
+     lambda m: int(m[1]) / max(int(m[2]), 1)),
+    (re.compile(r"(\d*)\s*([%s])" % "".join(UNICODE_FRACTIONS)),
+     lambda m: int(m[1] or 0) + UNICODE_FRACTIONS[m[2]]),
+    (re.compile(r"(\d+(?:[.,]\d+)?)"),
+     lambda m: float(m[1].replace(",", "."))),
+]
+
+RANGE_PATTERN = re.compile(r"\s*(?:-|–|to\b)\s*(?=[\d%s])" % "".join(UNICODE_FRACTIONS))
+
+# Parsing #########################################################################
+
+
+def parse_quantity(text: str) -> tuple:
+    """
+    Split a leading quantity off text, keeping the lower end of ranges.
+
+    :return: Quantity, ``None`` when there is none, and the remaining text
+    """
+    text = text.lstrip()
+    for pattern, value in QUANTITY_PATTERNS:
+        match = pattern.match(text)
+        if match and match[0].strip():
+            rest = text[match.end():]
+            range_match = RANGE_PATTERN.match(rest)
+            if range_match:
+                _, rest = parse_quantity(rest[range_match.end():])
+            return value(match), rest
+
+    return None, text
+
+
+def parse_ingredient_line(line: str, resolver: IngredientResolver) -> dict:
+    """
+    Parse a free text ingredient line such as "1 1/2 cups chopped onions".
+
+    :param line: Ingredient line
+    :param resolver: Ingredient name resolver
+    :return: ``{"name", "quantity", "unit"}``, ``None`` when no known
+        ingredient is found in the line
+    """
+    quantity, rest = parse_quantity(line)
+    unit = ""
+
+    if quantity is None:
+        quantity = 1
+    else:
+        match = UNIT_PATTERN.match(rest.lstrip())
+        if match:
+            unit, factor = UNIT_LOOKUP[re.sub(r"[\s.]", "", match[1].lower())]
+            quantity *= factor
+            rest = rest.lstrip()[match.end():]
+
+    name = resolver.resolve_phrase(rest)
+    if name is None:
+        return None
+
+    return {"name": name, "quantity": round(quantity, 4), "unit": unit}
+
+
+_resolver = None
+
+
+def init_worker(vocabulary: list):
+    """
+    Build the ingredient resolver once per worker process.
+    """
+    global _resolver
+    _resolver = IngredientResolver(vocabulary)
+
+
+def parse_records(records: list) -> list:
+    """
+    Parse a chunk of raw records in a worker.
+
+    :return: Recipes ready for ``SQLiteHelper.add_recipes``, each with the
+        list of ingredient lines that could not be resolved
+    """
+    recipes = []
+
+    for record in records:
+        ingredients, unresolved = [], []
+        for line in record["ingredients"]:
+            ingredient = parse_ingredient_line(line, _resolver)
+            if ingredient is None:
+                unresolved.append(line)
+            else:
+                ingredients.append(ingredient)
+
+        recipes.append({
+            "name": " ".join(record["name"].lower().split()),
+            "ingredients": ingredients,
+            "instructions": record.get("instructions") or None,
+            "unresolved": unresolved,
+        })
+
+    return recipes
+
+# Reading #########################################################################
+
+
+def normalize_record(data: dict) -> dict:
+    """
+    Map a JSONL object or schema.org Recipe onto ``name``, ``ingredients``
+    and ``instructions``.
+    """
+    name = data.get("name") or data.get("title")
+    ingredients = data.get("ingredients") or data.get("recipeIngredient") or []
+    instructions = data.get("instructions") or data.get("recipeInstructions") or ""
+
+    if isinstance(instructions, list):
+        instructions = "\n".join(
+            x.get("text", "") if isinstance(x, dict) else str(x) for x in instructions
+        )
+
+    if not name or not isinstance(ingredients, list):
+        return None
+
+    return {
+        "name": str(name),
+        "ingredients": [str(x) for x in ingredients],
+        "instructions": str(instructions).strip(),
+    }
+
+
+class JSONLDParser(HTMLParser):
+    """
+    Collect the contents of ``<script type="application/ld+json">`` tags.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.scripts = []
+        self._in_script = False
+
+    def handle_starttag(self, tag, attrs):
+        self._in_script = (
+            tag == "script" and dict(attrs).get("type") == "application/ld+json"
+        )
+        if self._in_script:
+            self.scripts.append("")
+
+    def handle_endtag(self, tag):
+        self._in_script = False
+
+    def handle_data(self, data):
+        if self._in_script:
+            self.scripts[-1] += data
+
+
+def find_recipes(data):
+    """
+    Yield schema.org Recipe objects nested anywhere in JSON-LD data.
+    """
+    if isinstance(data, list):
+        for item in data:
+            yield from find_recipes(item)
+    elif isinstance(data, dict):
+        kind = data.get("@type")
+        if kind == "Recipe" or (isinstance(kind, list) and "Recipe" in kind):
+            yield data
+        else:
+            yield from find_recipes(data.get("@graph", []))
+
+
+def read_html(path: str):
+
+    parser = JSONLDParser()
+    with open(path, encoding="utf-8", errors="replace") as fp:
+        parser.feed(fp.read())
+
+    for script in parser.scripts:
+        try:
+            data = json.loads(script)
+        except ValueError:
+            continue
+        yield from find_recipes(data)
+
+
+def read_jsonl(path: str):
+
+    with open(path, encoding="utf-8") as fp:
+        for line in fp:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def read_records(paths: list):
+    """
+    Yield normalized records from JSONL and HTML files and directories.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(root, x)
+                for root, _, names in os.walk(path) for x in names
+            )
+        else:
+            files = [path]
+
+        for fpath in files:
+            extension = os.path.splitext(fpath)[1].lower()
+            if extension in (".jsonl", ".ndjson"):
+                data = read_jsonl(fpath)
+            elif extension in (".html", ".htm"):
+                data = read_html(fpath)
+            else:
+                continue
+
+            for item in data:
+                record = normalize_record(item)
+                if record:
+                    yield record
+
+# Pipeline ########################################################################
+
+
+def parse_in_pool(records, vocabulary: list, workers: int, chunk_size: int = 256):
+    """
+    Parse records in a process pool, yielding results in input order.
+    """
+    return map_in_pool(parse_records, records, workers, init_worker, (vocabulary,), chunk_size)
+
+
+def ingest(paths: list, db_path: str, workers: int = None, batch_size: int = 500,
+           progress=None) -> dict:
+    """
+    Ingest corpora into the recipe database.
+
+    :param paths: JSONL/HTML files or directories
+    :param db_path: Path of the SQLite database
+    :param workers: Parsing processes, one per CPU when unset
+    :param batch_size: Recipes inserted per transaction
+    :param progress: Called with the running statistics after each batch
+    :return: Statistics: records read, recipes added, records skipped,
+        unresolved ingredient lines, elapsed seconds and records/sec
+    """
+    helper = SQLiteHelper(db_path)
+    vocabulary = [x[1] for x in helper.get_all_ingredients()]
+    workers = workers or os.cpu_count() or 1
+
+    stats = {"records": 0, "added": 0, "skipped": 0, "unresolved": 0}
+    start = time.perf_counter()
+
+    def update(batch):
+        stats["added"] += helper.add_recipes(batch)
+        stats["skipped"] = stats["records"] - stats["added"]
+        stats["elapsed"] = time.perf_counter() - start
+        stats["records_per_sec"] = stats["records"] / stats["elapsed"]
+        if progress:
+            progress(stats)
+
+    batch = []
+    for recipe in parse_in_pool(read_records(paths), vocabulary, workers):
+        stats["records"] += 1
+        stats["unresolved"] += len(recipe["unresolved"])
+        if recipe["ingredients"]:
+            batch.append(recipe)
+        if len(batch) >= batch_size:
+            update(batch)
+            batch = []
+    update(batch)
+
+    helper.conn.close()
+
+    return stats
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Ingest recipe corpora into recipe.db")
+    parser.add_argument("paths", nargs="+", help="JSONL/HTML files or directories")
+    parser.add_argument("--db", required=True, help="Path of recipe.db")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parsing processes, one per CPU by default")
+    parser.add_argument("--batch-size", type=int, default=500,
+                        help="Recipes inserted per transaction")
+    args = parser.parse_args(argv)
+
+    def progress(stats):
+        print(
+            "\r{records} records, {added} added, {records_per_sec:.0f} records/sec".format(**stats),
+            end="", file=sys.stderr, flush=True
+        )
+
+    stats = ingest(args.paths, args.db, args.workers, args.batch_size, progress)
+
+    print(file=sys.stderr)
+    print(
+        "Read {records} records in {elapsed:.2f}s ({records_per_sec:.0f} records/sec): "
+        "{added} added, {skipped} skipped, {unresolved} ingredient lines unresolved".format(**stats)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Headless JSON HTTP API over the recipe database
+
+    python -m recipeapp.server --db recipe.db --port 8080
+
+GET     /recipes?prefix=&after=     A page of recipe names, sorted ignoring case
+GET     /recipes/<name>             Ingredients of a recipe
+GET     /recipes/<name>/instructions
+                                    Instructions of a recipe
+POST    /recipes                    Add a recipe:
+                                    {"name": ..., "ingredients": [...], "instructions": ...}
+DELETE  /recipes/<name>             Delete a recipe
+GET     /ingredients?q=<text>       Ingredient names containing text
+GET     /pantry?ingredients=<a,b>   Recipes ranked by pantry coverage
+POST    /cart                       Shopping cart: {"recipes": [...]}
+"""
+
+import argparse
+import json
+import math
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from recipeapp.cart import build_cart
+from recipeapp.db.sqlite_helper.SQLiteHelperPool import SQLiteHelperPool
+from recipeapp.units import UNITS
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RecipeRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        url = urlsplit(self.path)
+        parts = [unquote(x) for x in url.path.strip("/").split("/")]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        routes = {
+            ("GET", "recipes", 1): self.list_recipes,
+            ("GET", "recipes", 2): self.get_recipe,
+            ("POST", "recipes", 1): self.add_recipe,
+            ("GET", "recipes", 3): self.get_recipe_instructions,
+            ("DELETE", "recipes", 2): self.delete_recipe,
+            ("GET", "ingredients", 1): self.search_ingredients,
+            ("GET", "pantry", 1): self.rank_pantry,
+            ("POST", "cart", 1): self.get_cart,
+        }
+
+        try:
+            route = routes.get((method, parts[0], len(parts)))
+            if route is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+            status, body = route(parts[1:], query)
+        except HTTPError as e:
+            status, body = e.status, {"error": str(e)}
+        except Exception as e:
+            self.log_error("%s", repr(e))
+            status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": repr(e)}
+
+        self.send_json(status, body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid JSON body")
+
+        if not isinstance(body, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "A JSON object is needed")
+
+        return body
+
+    def read_limit(self, query, default):
+        try:
+            limit = int(query.get("limit", default))
+        except ValueError:
+            limit = 0
+
+        if limit < 1:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "limit must be a positive integer")
+
+        return limit
+
+    def read_ingredients(self, ingredients):
+        """
+        Check recipe ingredients sent by a client.
+
+        :return: Ingredients as accepted by ``SQLiteHelper.add_recipe``
+        """
+        if not isinstance(ingredients, list) or not ingredients:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "At least 1 ingredient is needed")
+
+        checked = []
+        for x in ingredients:
+            if not isinstance(x, dict) or not isinstance(x.get("name"), str) or not x["name"]:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Every ingredient needs a name")
+
+            quantity = x.get("quantity")
+            if (isinstance(quantity, bool) or not isinstance(quantity, (int, float))
+                    or not math.isfinite(quantity) or quantity < 0):
+                raise HTTPError(
+                    HTTPStatus.BAD_REQUEST, f"Invalid quantity for {x['name']}"
+                )
+
+            if not isinstance(x.get("unit"), str) or x["unit"] not in UNITS:
+                raise HTTPError(
+                    HTTPStatus.BAD_REQUEST,
+                    "Unit of {0} must be one of: {1}".format(
+                        x["name"], ", ".join(repr(u) for u in UNITS)
+                    )
+                )
+
+            checked.append({"name": x["name"], "quantity": quantity, "unit": x["unit"]})
+
+        return checked
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # Endpoints ##################################################################
+
+    def list_recipes(self, args, query):
+
+        limit = self.read_limit(query, 100)
+        with self.server.pool.reader() as helper:
+            recipes = helper.get_recipes_page(
+                query.get("after"), query.get("prefix", ""), limit
+            )
+
+        return HTTPStatus.OK, {
+            "recipes": recipes,
+            "next": recipes[-1] if len(recipes) == limit else None
+        }
+
+    def get_recipe(self, args, query):
+
+        name = args[0].lower().strip()
+        with self.server.pool.reader() as helper:
+            if helper.get_recipe_id(name) is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Cannot find {name}")
+            ingredients = helper.get_recipe_ingredients(name)
+
+        return HTTPStatus.OK, {"name": name, "ingredients": ingredients}
+
+    def get_recipe_instructions(self, args, query):
+
+        name = args[0].lower().strip()
+        if args[1] != "instructions":
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+
+        with self.server.pool.reader() as helper:
+            if helper.get_recipe_id(name) is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Cannot find {name}")
+            instructions = helper.get_recipe_instructions(name)
+
+        return HTTPStatus.OK, {"name": name, "instructions": instructions}
+
+    def add_recipe(self, args, query):
+
+        body = self.read_json()
+        name = body.get("name")
+        if not isinstance(name, str) or not name.strip():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "A recipe name is needed")
+        name = name.lower().strip()
+
+        ingredients = self.read_ingredients(body.get("ingredients"))
+
+        instructions = body.get("instructions")
+        if instructions is not None and not isinstance(instructions, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Instructions must be text")
+
+        with self.server.pool.writer() as helper:
+            success = helper.add_recipe(name, ingredients, instructions)
+
+        if not success:
+            raise HTTPError(
+                HTTPStatus.CONFLICT,
+                "Could not save recipe. Check the name is unused and the ingredients exist"
+            )
+
+        return HTTPStatus.CREATED, {"name": name}
+
+    def delete_recipe(self, args, query):
+
+        name = args[0].lower().strip()
+        with self.server.pool.writer() as helper:
+            if helper.get_recipe_id(name) is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Cannot find {name}")
+            helper.delete_recipe(name)
+
+        return HTTPStatus.OK, {"name": name}
+
+    def search_ingredients(self, args, query):
+
+        limit = self.read_limit(query, 50)
+        with self.server.pool.reader() as helper:
+            ingredients = helper.search_ingredients(query.get("q", ""), limit)
+
+        return HTTPStatus.OK, {"ingredients": ingredients}
+
+    def rank_pantry(self, args, query):
+
+        pantry = [x for x in query.get("ingredients", "").split(",") if x.strip()]
+        limit = self.read_limit(query, 50)
+        index = self.server.pool.get_ingredient_index()
+        with self.server.pool.reader() as helper:
+            ranking = helper.rank_recipes_by_coverage(pantry, limit, index=index)
+
+        return HTTPStatus.OK, {
+            "recipes": [
+                {"name": name, "matched": matched, "total": total}
+                for name, matched, total in ranking
+            ]
+        }
+
+    def get_cart(self, args, query):
+
+        recipes = self.read_json().get("recipes")
+        if not isinstance(recipes, list):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "A list of recipes is needed")
+
+        with self.server.pool.reader() as helper:
+            cart = build_cart(helper, [str(x).lower().strip() for x in recipes])
+
+        return HTTPStatus.OK, {"cart": cart}
+
+
+class RecipeServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, db_path, readers=4, verbose=False):
+        """
+        :param address: ``(host, port)`` to listen on
+        :param db_path: Path of the SQLite database
+        :param readers: Number of read-only database connections
+        :param verbose: Log every request
+        """
+        self.pool = SQLiteHelperPool(db_path, readers)
+        self.verbose = verbose
+
+        super().__init__(address, RecipeRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.close()
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Serve the recipe database over HTTP")
+    parser.add_argument("--db", required=True, help="Path of recipe.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--readers", type=int, default=4,
+                        help="Number of read-only database connections")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    server = RecipeServer((args.host, args.port), args.db, args.readers, args.verbose)
+    host, port = server.server_address[:2]
+    print(f"Serving on http://{host}:{port}", flush=True)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Units of measure used in recipes
+"""
+
+from functools import lru_cache
+
+# Unit name -> (pint unit name, dimension, factor to the dimension base unit).
+# Volumes are in millilitres and masses in grams, following pint's US
+# customary definitions. The empty unit counts items.
+UNITS = {
+    "tbs": ("tbs", "volume", 14.78676478125),
+    "fl oz": ("floz", "volume", 29.5735295625),
+    "gill": ("gill", "volume", 118.29411825),
+    "cup": ("cup", "volume", 236.5882365),
+    "pt": ("pt", "volume", 473.176473),
+    "qt": ("qt", "volume", 946.352946),
+    "gal": ("gal", "volume", 3785.411784),
+    "lb": ("lb", "mass", 453.59237),
+    "oz": ("oz", "mass", 28.349523125),
+    "": (None, "count", 1.0),
+}
+
+DIMENSIONS = ["count", "volume", "mass"]
+
+
+def to_base(quantity: float, unit: str) -> tuple:
+    """
+    Convert a quantity to the base unit of its dimension.
+
+    :param quantity: Quantity in ``unit``
+    :param unit: Unit name, ``None`` or empty for counted items
+    :return: ``(base quantity, dimension)``, ``(None, None)`` for unknown units
+    """
+    if unit not in UNITS and unit is not None:
+        return None, None
+
+    _, dimension, factor = UNITS[unit or ""]
+
+    return float(quantity) * factor, dimension
+
+
+@lru_cache(maxsize=None)
+def get_pint_units() -> dict:
+    """
+    Map unit names to pint units. Pint is slow to import and to build a
+    registry for, so this only happens the first time it is needed.
+
+    :return: Pint unit per unit name, ``None`` for counted items
+    """
+    import pint
+
+    ureg = pint.UnitRegistry()
+
+    return {
+        name: getattr(ureg, pint_name) if pint_name else None
+        for name, (pint_name, _, _) in UNITS.items()
+    }
@@ -0,0 +1,61 @@
+"""
+Helpers shared by the command line tools
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+
+def chunked(iterable, size: int):
+    """
+    Split an iterable into lists of ``size`` items, the last one shorter,
+    consuming it lazily.
+
+    :param iterable: Items
+    :param size: Items per chunk
+    :return: Generator of lists
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_in_pool(function, items, workers: int, initializer, initargs: tuple = (),
+                chunk_size: int = 256):
+    """
+    Apply a function to chunks of items in a process pool, yielding its
+    results in input order.
+
+    Only a few chunks per worker are in flight at a time, so arbitrarily
+    large inputs stream through in bounded memory. With a single worker,
+    chunks are processed in this process instead.
+
+    :param function: Called with a list of items, returning an iterable of
+        results
+    :param items: Items
+    :param workers: Processes in the pool
+    :param initializer: Called with ``initargs`` in every worker first
+    :param initargs: Arguments of ``initializer``
+    :param chunk_size: Items per call of ``function``
+    :return: Generator of results
+    """
+    if workers <= 1:
+        initializer(*initargs)
+        for chunk in chunked(items, chunk_size):
+            yield from function(chunk)
+        return
+
+    with ProcessPoolExecutor(
+        workers, initializer=initializer, initargs=initargs
+    ) as executor:
+        pending = deque()
+        for chunk in chunked(items, chunk_size):
+            pending.append(executor.submit(function, chunk))
+            if len(pending) >= workers * 4:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import pytest
+
+import recipeapp.resources
+from recipeapp.db.sqlite_helper.SQLiteHelper import SQLiteHelper
+
+INGREDIENTS = ["penne", "sauce", "aubergine", "courgette", "onion", "egg"]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """
+    Path of a small recipe database.
+    """
+    db_path = str(tmp_path / "recipe.db")
+
+    helper = SQLiteHelper(db_path)
+    helper.conn.executemany(
+        "INSERT INTO ingredient (name) VALUES (?)",
+        [(x,) for x in INGREDIENTS]
+    )
+    helper.conn.commit()
+
+    helper.add_recipe("classic pasta", [
+        {"name": "penne", "quantity": 1, "unit": "lb"},
+        {"name": "sauce", "quantity": 1, "unit": "lb"},
+        {"name": "courgette", "quantity": 9, "unit": "oz"},
+        {"name": "onion", "quantity": 4, "unit": "oz"},
+    ])
+    helper.add_recipe("ratatouille", [
+        {"name": "aubergine", "quantity": 9, "unit": "oz"},
+        {"name": "courgette", "quantity": 9, "unit": "oz"},
+        {"name": "onion", "quantity": 1, "unit": ""},
+    ])
+    helper.add_recipe("omelette", [
+        {"name": "egg", "quantity": 3, "unit": ""},
+        {"name": "onion", "quantity": 1, "unit": ""},
+    ])
+
+    helper.conn.close()
+
+    return db_path
+
+
+@pytest.fixture
+def helper(db_path):
+
+    return SQLiteHelper(db_path)
+
+
+@pytest.fixture(scope="session")
+def bundled_db_path():
+    """
+    Path of the recipe database shipped with the app, only to be read.
+    """
+    return str(Path(recipeapp.resources.__file__).parent / "recipe.db")
+
+
+@pytest.fixture(scope="session")
+def bundled_resolver(bundled_db_path):
+    """
+    Resolver over the ingredient vocabulary shipped with the app.
+    """
+    helper = SQLiteHelper(bundled_db_path, read_only=True)
+    resolver = helper.get_ingredient_resolver()
+    helper.conn.close()
+
+    return resolver
@@ -0,0 +1,80 @@
+import csv
+import json
+
+import pytest
+
+from recipeapp.batch import run_batch
+from recipeapp.cart import build_cart
+from recipeapp.db.sqlite_helper.SQLiteHelper import SQLiteHelper
+
+PLANS = {
+    "week1.json": ["classic pasta", "omelette"],
+    "week2.json": ["ratatouille", "omelette", "omelette"],
+    "week3.json": [],
+}
+
+
+@pytest.fixture
+def plans_dir(tmp_path):
+    plans_dir = tmp_path / "plans"
+    plans_dir.mkdir()
+    for name, recipes in PLANS.items():
+        (plans_dir / name).write_text(json.dumps({
+            "selected_recipes": recipes, "additional_items": "bread\n\nmilk"
+        }))
+    (plans_dir / "broken.json").write_text("{")
+
+    return plans_dir
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch_jsonl(db_path, plans_dir, tmp_path, workers):
+    output = tmp_path / "carts.jsonl"
+
+    stats = run_batch([str(plans_dir)], db_path, str(output), workers=workers, chunk_size=1)
+
+    assert (stats["plans"], stats["failed"]) == (4, 1)
+    results = [json.loads(x) for x in output.read_text().splitlines()]
+    assert [x["plan"] for x in results] == [
+        str(plans_dir / x) for x in ["broken.json", "week1.json", "week2.json", "week3.json"]
+    ]
+    assert "error" in results[0]
+
+    helper = SQLiteHelper(db_path)
+    for result in results[1:]:
+        expected = build_cart(helper, PLANS[result["plan"].rsplit("/", 1)[1]])
+        assert result["cart"] == expected
+        assert result["additional_items"] == "bread\n\nmilk"
+
+
+def test_run_batch_csv(db_path, plans_dir, tmp_path):
+    output = tmp_path / "carts.csv"
+
+    run_batch([str(plans_dir / "week1.json")], db_path, str(output), workers=1)
+
+    with open(output, newline="") as fp:
+        rows = list(csv.reader(fp))
+
+    plan = str(plans_dir / "week1.json")
+    assert rows[0] == ["plan", "item", "quantity"]
+    assert [plan, "onion", "4.00 oz and 1 items"] in rows
+    assert rows[-2:] == [[plan, "bread", ""], [plan, "milk", ""]]
+
+
+def test_run_batch_invalid_additional_items(db_path, tmp_path):
+    plan = tmp_path / "week.json"
+    plan.write_text(json.dumps({"selected_recipes": ["omelette"], "additional_items": ["bread"]}))
+    output = tmp_path / "carts.csv"
+
+    stats = run_batch([str(plan)], db_path, str(output), workers=1)
+
+    assert (stats["plans"], stats["failed"]) == (1, 1)
+    assert output.read_text().splitlines() == ["plan,item,quantity"]
+
+
+def test_run_batch_missing_database(plans_dir, tmp_path):
+    db_path = tmp_path / "missing.db"
+
+    with pytest.raises(FileNotFoundError):
+        run_batch([str(plans_dir)], str(db_path), str(tmp_path / "carts.jsonl"), workers=1)
+    assert not db_path.exists()
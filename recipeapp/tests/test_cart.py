@@ -0,0 +1,162 @@
+import random
+import re
+
+import pytest
+
+from recipeapp.cart import aggregate_rows, build_cart
+
+ROWS = [
+    (1, "penne", 1, "lb"),
+    (2, "onion", 2, ""),
+    (3, "courgette", 9, "oz"),
+    (1, "penne", 8, "oz"),
+    (4, "milk", 1, "cup"),
+    (3, "courgette", 1, "lb"),
+    (1, "penne", 8, "oz"),
+    (4, "milk", 2, "tbs"),
+    (4, "milk", 1, ""),
+    (2, "onion", 1, ""),
+]
+
+EXPECTED = [
+    {"ingredient": "penne", "quantity": "32.00 oz"},
+    {"ingredient": "courgette", "quantity": "25.00 oz"},
+    {"ingredient": "milk", "quantity": "1.12 cup and 1 items"},
+    {"ingredient": "onion", "quantity": "3 items"},
+]
+
+
+def test_numpy_backend():
+    pytest.importorskip("numpy")
+
+    assert aggregate_rows(ROWS, {}, backend="numpy") == EXPECTED
+    assert aggregate_rows([], {}, backend="numpy") == []
+
+
+def test_numpy_backend_mixed_dimensions():
+    pytest.importorskip("numpy")
+
+    rows = [(1, "butter", 2, "tbs"), (1, "butter", 4, "oz")]
+
+    assert aggregate_rows(rows, {}, backend="numpy") == [
+        {"ingredient": "butter", "quantity": "2.00 tbs and 4.00 oz"}
+    ]
+
+
+def test_python_backend():
+    pytest.importorskip("pint")
+    from recipeapp.units import get_pint_units
+
+    units = get_pint_units()
+
+    assert aggregate_rows(ROWS, units, backend="python") == EXPECTED
+
+
+def test_numpy_backend_counts_only():
+    pytest.importorskip("numpy")
+
+    rows = [(2, "onion", 2, ""), (5, "egg", 3, None), (2, "onion", 1, "")]
+
+    assert aggregate_rows(rows, {}, backend="numpy") == [
+        {"ingredient": "onion", "quantity": "3 items"},
+        {"ingredient": "egg", "quantity": "3 items"},
+    ]
+
+
+def test_build_cart_matches_backends(helper):
+    pytest.importorskip("numpy")
+
+    rng = random.Random(0)
+    units = ["", "tbs", "cup", "fl oz", "oz", "lb"]
+    helper.add_recipes([
+        {"name": "random %d" % i, "ingredients": [
+            {"name": name, "quantity": rng.randint(1, 12), "unit": rng.choice(units)}
+            for name in rng.sample(["penne", "sauce", "aubergine", "courgette", "onion", "egg"], 4)
+        ]}
+        for i in range(200)
+    ])
+    names = ["classic pasta", "omelette", "classic pasta", "unknown"]
+    names += ["random %d" % rng.randrange(200) for _ in range(100)]
+
+    for selection in [names[:1], names[:4], names]:
+        assert build_cart(helper, selection) == aggregate_rows(
+            helper.get_cart_rows(selection), {}, backend="numpy"
+        )
+
+    assert build_cart(helper, []) == []
+
+
+def test_build_cart_unknown_units(helper):
+    # Rows written before units were checked, with units not in UNITS
+    omelette = helper.get_recipe_id("omelette")
+    egg = helper.get_ingredient_id("egg")
+    helper.conn.executemany(
+        "INSERT INTO recipe_ingredient (recipe, ingredient, quantity, unit) VALUES (?, ?, ?, ?)",
+        [(omelette, egg, 2, "dozen"), (omelette, egg, 1, "dozen"), (omelette, egg, 5, "g")]
+    )
+    helper.conn.commit()
+
+    assert build_cart(helper, ["omelette", "omelette"]) == [
+        {"ingredient": "egg", "quantity": "6.00 dozen and 10.00 g and 6 items"},
+        {"ingredient": "onion", "quantity": "2 items"},
+    ]
+
+
+def test_build_cart_unknown_units_numpy(helper):
+    pytest.importorskip("numpy")
+
+    omelette = helper.get_recipe_id("omelette")
+    helper.conn.executemany(
+        "INSERT INTO recipe_ingredient (recipe, ingredient, quantity, unit) VALUES (?, ?, ?, ?)",
+        [(omelette, helper.get_ingredient_id(name), quantity, unit) for name, quantity, unit in [
+            ("egg", 5, "g"), ("egg", 2, "dozen"), ("onion", 1, "dozen"), ("egg", 1, "dozen")
+        ]]
+    )
+    helper.conn.commit()
+
+    for selection in [["omelette"], ["classic pasta", "omelette", "omelette"]]:
+        assert build_cart(helper, selection) == aggregate_rows(
+            helper.get_cart_rows(selection), backend="numpy"
+        )
+
+
+def same_quantities(a, b):
+    """
+    Whether two quantity texts match, numbers within 0.01.
+    """
+    numbers = r"[\d.]+"
+    if re.sub(numbers, "", a) != re.sub(numbers, "", b):
+        return False
+
+    return all(
+        abs(float(x) - float(y)) <= 0.0101
+        for x, y in zip(re.findall(numbers, a), re.findall(numbers, b))
+    )
+
+
+def test_build_cart_matches_pint(helper):
+    pytest.importorskip("pint")
+    from recipeapp.units import get_pint_units
+
+    # Pint can't add mass to volume: every ingredient is measured in one
+    rng = random.Random(0)
+    units = {name: ["", "oz", "lb"] for name in ["penne", "sauce", "aubergine", "courgette", "onion"]}
+    units["egg"] = ["", "tbs", "cup", "pt"]
+    helper.add_recipes([
+        {"name": "random %d" % i, "ingredients": [
+            {"name": name, "quantity": rng.randint(1, 12), "unit": rng.choice(units[name])}
+            for name in rng.sample(sorted(units), 4)
+        ]}
+        for i in range(200)
+    ])
+    names = ["classic pasta", "omelette", "classic pasta", "unknown"]
+    names += ["random %d" % rng.randrange(200) for _ in range(100)]
+
+    for selection in [names[:1], names[:4], names]:
+        cart = build_cart(helper, selection)
+        reference = aggregate_rows(
+            helper.get_cart_rows(selection), get_pint_units(), backend="python"
+        )
+        assert [x["ingredient"] for x in cart] == [x["ingredient"] for x in reference]
+        for x, y in zip(cart, reference):
+            assert same_quantities(x["quantity"], y["quantity"]), (x, y)
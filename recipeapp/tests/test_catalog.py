@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import struct
+
+import pytest
+
+from recipeapp.catalog import export_catalog, import_catalog
+from recipeapp.db.sqlite_helper.SQLiteHelper import SQLiteHelper
+
+TABLES = {
+    "ingredient": "SELECT id, name FROM ingredient ORDER BY id",
+    "recipe": "SELECT id, name FROM recipe ORDER BY id",
+    "recipe_ingredient": """
+        SELECT recipe, ingredient, quantity, unit, base_quantity, dimension
+        FROM recipe_ingredient ORDER BY recipe, rowid
+    """,
+    "recipe_instructions": "SELECT recipe, codec, data FROM recipe_instructions ORDER BY recipe",
+}
+
+
+def dump(db_path):
+    helper = SQLiteHelper(db_path, read_only=True)
+    tables = {name: helper.conn.execute(query).fetchall() for name, query in TABLES.items()}
+    helper.conn.close()
+
+    return tables
+
+
+def test_catalog_round_trip(db_path, tmp_path):
+    helper = SQLiteHelper(db_path)
+    helper.set_recipe_instructions("omelette", "Beat the eggs. " * 100)
+    helper.add_recipes([
+        {"name": "recipe %d" % i, "ingredients": [
+            {"name": "onion", "quantity": i / 3, "unit": "cup"},
+            {"name": "egg", "quantity": i, "unit": ""},
+        ], "instructions": "Step %d." % i if i % 2 else None}
+        for i in range(1, 100)
+    ])
+    helper.conn.execute(
+        "INSERT INTO recipe_ingredient (recipe, ingredient, quantity, unit) VALUES (1, 1, 2, NULL)"
+    )
+    helper.conn.commit()
+    helper.conn.close()
+
+    catalog_path = str(tmp_path / "recipes.rcat")
+    exported = export_catalog(db_path, catalog_path, chunk_size=16)
+    assert (exported["ingredients"], exported["recipes"], exported["rows"]) == (6, 102, 208)
+
+    new_db_path = str(tmp_path / "new.db")
+    imported = import_catalog(catalog_path, new_db_path)
+    assert (imported["ingredients"], imported["recipes"], imported["rows"]) == (6, 102, 208)
+
+    original, loaded = dump(db_path), dump(new_db_path)
+    # Rows without a unit are counted items once loaded
+    original["recipe_ingredient"] = [
+        x[:4] + (x[2], "count") if x[3] is None else x for x in original["recipe_ingredient"]
+    ]
+    assert loaded == original
+
+    assert os.path.getsize(catalog_path) < os.path.getsize(db_path) / 4
+
+    helper = SQLiteHelper(new_db_path, read_only=True)
+    indexes = {x[1] for x in helper.conn.execute("PRAGMA index_list(recipe_ingredient)")}
+    assert {"recipe_ingredient_ingredient_idx", "recipe_ingredient_recipe_idx"} <= indexes
+    helper.conn.close()
+
+    with pytest.raises(FileExistsError):
+        import_catalog(catalog_path, new_db_path)
+
+
+def test_not_a_catalog(tmp_path):
+    path = tmp_path / "recipes.rcat"
+    path.write_bytes(b"SQLite format 3\x00")
+
+    new_db_path = tmp_path / "new.db"
+    with pytest.raises(ValueError):
+        import_catalog(str(path), str(new_db_path))
+    assert not os.path.exists(new_db_path)
+    assert os.listdir(tmp_path) == ["recipes.rcat"]
+
+    # A catalog cut short fails part way through the import
+    path.write_bytes(b"RCAT\x01\x00")
+    with pytest.raises(struct.error):
+        import_catalog(str(path), str(new_db_path))
+    assert os.listdir(tmp_path) == ["recipes.rcat"]
+
+
+def test_export_orphan_rows(db_path, tmp_path):
+    helper = SQLiteHelper(db_path)
+    helper.conn.execute("DELETE FROM recipe WHERE name = 'ratatouille'")
+    helper.conn.commit()
+    helper.conn.close()
+
+    exported = export_catalog(db_path, str(tmp_path / "recipes.rcat"))
+    assert (exported["recipes"], exported["rows"], exported["skipped"]) == (2, 6, 3)
+
+
+def test_export_legacy_database(tmp_path):
+    # Schema of databases made before units and instructions were split out
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE ingredient (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+        CREATE TABLE recipe (id INTEGER PRIMARY KEY, name TEXT UNIQUE, instructions TEXT);
+        CREATE TABLE recipe_ingredient (recipe INTEGER, ingredient INTEGER,
+                                        quantity FLOAT, unit TEXT);
+        INSERT INTO ingredient (id, name) VALUES (1, 'egg'), (2, 'onion');
+        INSERT INTO recipe (id, name) VALUES (1, 'omelette');
+        INSERT INTO recipe_ingredient VALUES (1, 1, 3, ''), (1, NULL, 1, 'oz'), (1, 2, 1, 'cup');
+    """)
+    conn.close()
+
+    catalog_path = str(tmp_path / "recipes.rcat")
+    exported = export_catalog(db_path, catalog_path)
+    assert (exported["recipes"], exported["rows"], exported["skipped"]) == (1, 2, 1)
+
+    # Exporting leaves the database as it was
+    conn = sqlite3.connect(db_path)
+    tables = {x[0] for x in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    assert tables == {"ingredient", "recipe", "recipe_ingredient"}
+
+    new_db_path = str(tmp_path / "new.db")
+    import_catalog(catalog_path, new_db_path)
+    assert SQLiteHelper(new_db_path, read_only=True).get_recipe_ingredients("omelette") == [
+        {"name": "egg", "quantity": 3, "unit": ""},
+        {"name": "onion", "quantity": 1, "unit": "cup"},
+    ]
+
+    with pytest.raises(FileNotFoundError):
+        export_catalog(str(tmp_path / "missing.db"), catalog_path)
+    assert not os.path.exists(tmp_path / "missing.db")
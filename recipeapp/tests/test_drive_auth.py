@@ -0,0 +1,170 @@
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from recipeapp.gdrive.DriveAuthManager import DriveAuthManager
+
+credentials = pytest.importorskip("google.oauth2.credentials")
+pytest.importorskip("google.auth.transport.requests")
+
+
+class TokenHandler(BaseHTTPRequestHandler):
+    """
+    Stub OAuth token endpoint handing out numbered access tokens.
+    """
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.release.wait()
+        self.server.refreshes += 1
+        if self.server.revoked:
+            body = json.dumps({"error": "invalid_grant"}).encode()
+            self.send_response(400)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        body = json.dumps({
+            "access_token": "token-%d" % self.server.refreshes,
+            "expires_in": 3600,
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def token_server(monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), TokenHandler)
+    server.refreshes = 0
+    server.revoked = False
+    server.release = threading.Event()
+    server.release.set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Loading a token file always points the credentials at Google's endpoint
+    monkeypatch.setattr(
+        credentials, "_GOOGLE_OAUTH2_TOKEN_ENDPOINT",
+        "http://127.0.0.1:%d/token" % server.server_address[1]
+    )
+
+    yield server
+
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def write_token(path, expires_in):
+    expiry = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=expires_in)
+    path.write_text(json.dumps({
+        "token": "token-0",
+        "refresh_token": "refresh",
+        "client_id": "client",
+        "client_secret": "secret",
+        "scopes": ["https://www.googleapis.com/auth/drive"],
+        "expiry": expiry.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }))
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_background_refresh_before_expiry(tmp_path, token_server):
+    token_path = tmp_path / "token.json"
+    # Still valid, but within the refresh margin
+    write_token(token_path, expires_in=280)
+
+    auth = DriveAuthManager("unused.json", str(token_path), refresh_margin=300)
+    creds = auth.get_credentials()
+    assert creds.token == "token-0"
+
+    auth.start()
+    try:
+        wait_for(lambda: token_server.refreshes == 1 and creds.token == "token-1")
+
+        assert auth.get_credentials() is creds
+        assert creds.token == "token-1"
+        assert json.loads(token_path.read_text())["token"] == "token-1"
+        assert 3000 < auth.seconds_until_refresh() <= 3300
+    finally:
+        auth.stop()
+
+    assert token_server.refreshes == 1
+
+
+def test_lazy_load_without_refresh(tmp_path, token_server):
+    token_path = tmp_path / "token.json"
+    write_token(token_path, expires_in=3600)
+
+    auth = DriveAuthManager("unused.json", str(token_path))
+    assert auth.seconds_until_refresh() is None
+
+    # Nothing to keep fresh before the first load
+    auth.start()
+    assert auth._thread is None
+
+    assert auth.get_credentials().token == "token-0"
+    assert token_server.refreshes == 0
+
+
+def test_get_credentials_during_refresh(tmp_path, token_server):
+    token_path = tmp_path / "token.json"
+    write_token(token_path, expires_in=280)
+
+    auth = DriveAuthManager("unused.json", str(token_path), refresh_margin=300)
+    creds = auth.get_credentials()
+
+    # Hold the background refresh at the token endpoint
+    token_server.release.clear()
+    auth.start()
+    try:
+        wait_for(lambda: auth._refresh_lock.locked())
+        assert auth._refresh_lock.locked()
+
+        result = []
+        reader = threading.Thread(target=lambda: result.append(auth.get_credentials()))
+        reader.start()
+        reader.join(1)
+        assert result == [creds]
+        assert auth.seconds_until_refresh() < 0
+    finally:
+        token_server.release.set()
+        auth.stop()
+
+
+def test_failed_refresh_does_not_log_in_again(tmp_path, token_server, monkeypatch):
+    token_path = tmp_path / "token.json"
+    write_token(token_path, expires_in=280)
+    token_server.revoked = True
+
+    auth = DriveAuthManager(
+        "unused.json", str(token_path), refresh_margin=300, retry_interval=0.01
+    )
+    loads = []
+    load = auth._load
+    monkeypatch.setattr(auth, "_load", lambda: loads.append(1) or load())
+
+    auth.get_credentials()
+    auth.start()
+    auth._thread.join(10)
+
+    # The revoked refresh token is tried once, the login flow never again
+    assert not auth._thread.is_alive()
+    assert token_server.refreshes == 1
+    assert loads == [1]
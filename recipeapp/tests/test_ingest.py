@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+from recipeapp.db.sqlite_helper.IngredientResolver import IngredientResolver
+from recipeapp.db.sqlite_helper.SQLiteHelper import SQLiteHelper
+from recipeapp.ingest import ingest, parse_ingredient_line
+
+RESOLVER = IngredientResolver(["onion", "red onion", "penne", "egg", "courgette", "tomato"])
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("1 lb penne", ("penne", 1, "lb")),
+    ("1 1/2 cups chopped onions", ("onion", 1.5, "cup")),
+    ("½ red onion, sliced", ("red onion", 0.5, "")),
+    ("2-3 courgettes", ("courgette", 2, "")),
+    ("1 tomato", ("tomato", 1, "")),
+    ("3 Tbsp. tomato puree", ("tomato", 3, "tbs")),
+    ("2 fl. oz tomato juice", ("tomato", 2, "fl oz")),
+    ("eggs", ("egg", 1, "")),
+    ("100 g penne", ("penne", 3.5274, "oz")),
+])
+def test_parse_ingredient_line(line, expected):
+    ingredient = parse_ingredient_line(line, RESOLVER)
+
+    assert (ingredient["name"], ingredient["quantity"], ingredient["unit"]) == expected
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("2 tbsp olive oil", ("olive_oil", 2, "tbs")),
+    ("1 package cream cheese, softened", ("cream_cheese", 1, "")),
+    ("1 (14 oz) can coconut milk", ("coconut_milk", 1, "")),
+    ("3 cloves garlic, crushed", ("garlic", 3, "")),
+    ("1 tsp ground cloves", ("cloves", 0.3333, "tbs")),
+    ("Salt and freshly ground black pepper", ("black_pepper", 1, "")),
+    ("200 g self raising flour", ("self-raising_flour", 7.0548, "oz")),
+    ("1 large red onion, finely chopped", ("red_onion", 1, "")),
+])
+def test_parse_ingredient_line_bundled_vocabulary(bundled_resolver, line, expected):
+    ingredient = parse_ingredient_line(line, bundled_resolver)
+
+    assert (ingredient["name"], ingredient["quantity"], ingredient["unit"]) == expected
+
+
+def test_parse_ingredient_line_unknown():
+    assert parse_ingredient_line("a pinch of salt", RESOLVER) is None
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_ingest(tmp_path, db_path, workers):
+    helper = SQLiteHelper(db_path)
+    helper.conn.execute("INSERT INTO ingredient (name) VALUES ('tomato')")
+    helper.conn.commit()
+
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text("\n".join(json.dumps(x) for x in [
+        {"name": "Penne all'Arrabbiata", "ingredients": ["1 lb penne", "2 tomatoes"],
+         "instructions": "Boil the penne."},
+        {"title": "Onion Soup", "ingredients": ["4 onions", "a pinch of salt"]},
+        {"name": "Nothing known", "ingredients": ["a pinch of salt"]},
+        {"name": "Omelette", "ingredients": ["3 eggs"]},  # Already there
+    ]))
+    pages = tmp_path / "pages"
+    pages.mkdir()
+    (pages / "frittata.html").write_text("""
+        <html><head><script type="application/ld+json">
+        {"@context": "https://schema.org", "@graph": [
+            {"@type": "WebPage"},
+            {"@type": "Recipe", "name": "Frittata",
+             "recipeIngredient": ["6 eggs", "1 courgette"],
+             "recipeInstructions": [{"@type": "HowToStep", "text": "Bake."}]}
+        ]}
+        </script></head></html>
+    """)
+
+    stats = ingest([str(corpus), str(pages)], db_path, workers=workers, batch_size=2)
+
+    assert stats["records"] == 5
+    assert stats["added"] == 3
+    assert stats["skipped"] == 2
+    assert stats["unresolved"] == 2
+
+    assert helper.get_recipe_ingredients("penne all'arrabbiata") == [
+        {"name": "penne", "quantity": 1, "unit": "lb"},
+        {"name": "tomato", "quantity": 2, "unit": ""},
+    ]
+    assert helper.get_recipe_instructions("frittata") == "Bake."
+    assert helper.get_recipe_id("onion soup") is not None
+
+
+def test_ingest_bundled_vocabulary(tmp_path, bundled_db_path):
+    bundled = SQLiteHelper(bundled_db_path, read_only=True)
+    vocabulary = bundled.get_all_ingredients()
+    bundled.conn.close()
+
+    db_path = str(tmp_path / "recipe.db")
+    helper = SQLiteHelper(db_path)
+    helper.conn.executemany("INSERT INTO ingredient (id, name) VALUES (?, ?)", vocabulary)
+    helper.conn.commit()
+
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text(json.dumps({
+        "name": "Garlic Cheese Toast",
+        "ingredients": [
+            "2 tbsp olive oil",
+            "1 package cream cheese",
+            "3 cloves garlic",
+            "Salt and freshly ground black pepper",
+        ],
+    }))
+
+    stats = ingest([str(corpus)], db_path, workers=1)
+
+    assert stats["added"] == 1
+    assert stats["unresolved"] == 0
+    assert helper.get_recipe_ingredients("garlic cheese toast") == [
+        {"name": "olive_oil", "quantity": 2, "unit": "tbs"},
+        {"name": "cream_cheese", "quantity": 1, "unit": ""},
+        {"name": "garlic", "quantity": 3, "unit": ""},
+        {"name": "black_pepper", "quantity": 1, "unit": ""},
+    ]
@@ -0,0 +1,77 @@
+import random
+
+from recipeapp.db.sqlite_helper.IngredientIndex import IngredientIndex
+
+
+def make_index(recipes=2000, ingredients=60, seed=0):
+    rng = random.Random(seed)
+    recipe_names = {
+        r: "recipe {0}".format(x) for r, x in enumerate(rng.sample(range(10 ** 6), recipes), 1)
+    }
+    rows = sorted(
+        (i, r) for r in recipe_names for i in rng.sample(range(ingredients), rng.randint(2, 12))
+    )
+
+    return IngredientIndex(rows, recipe_names)
+
+
+def test_recipes_with_all():
+    index = make_index()
+
+    expected = sorted(
+        set(index.postings[3]) & set(index.postings[7]), key=index.recipe_names.get
+    )
+    assert index.recipes_with_all([3, 7, 3]) == expected
+    assert index.recipes_with_all([]) == []
+
+
+def test_rank_by_coverage_limit():
+    index = make_index()
+
+    for pantry in ([1], [1, 2, 3], list(range(0, 60, 4)), [999]):
+        ranking = index.rank_by_coverage(pantry)
+        assert index.rank_by_coverage(pantry, 50) == ranking[:50]
+
+        expected = [x for x in ranking if index.recipe_names[x[0]].startswith("recipe 1")]
+        assert index.rank_by_coverage(pantry, 50, "recipe 1") == expected[:50]
+        assert index.rank_by_coverage(pantry, prefix="recipe 1") == expected
+
+
+def test_with_and_without_recipes():
+    rng = random.Random(1)
+    index = make_index(recipes=300, ingredients=20)
+    recipes = {r: (n, set(i for i, x in index.postings.items() if r in x))
+               for r, n in index.recipe_names.items()}
+    original = index
+
+    for step in range(40):
+        if step % 3:
+            new = [
+                (1000 + step * 10 + k, "recipe {0}".format(rng.randrange(10 ** 7)),
+                 rng.sample(range(24), rng.randint(0, 6)))
+                for k in range(rng.randint(1, 3))
+            ]
+            index = index.with_recipes(new)
+            recipes.update((r, (n, set(i))) for r, n, i in new)
+        else:
+            gone = rng.sample(sorted(recipes), 3) + [999999]
+            index = index.without_recipes(gone)
+            for r in gone:
+                recipes.pop(r, None)
+
+    rebuilt = IngredientIndex(
+        sorted((i, r) for r, (_, ingredients) in recipes.items() for i in ingredients),
+        {r: n for r, (n, _) in recipes.items()}
+    )
+    for attribute in ["recipe_names", "recipe_ids", "sorted_names", "recipe_sizes",
+                      "postings", "bitsets", "size_bitsets"]:
+        assert getattr(index, attribute) == getattr(rebuilt, attribute), attribute
+
+    for pantry in ([1], [1, 2, 3], list(range(0, 24, 3))):
+        assert index.rank_by_coverage(pantry, 20) == rebuilt.rank_by_coverage(pantry, 20)
+        assert index.recipes_with_all(pantry[:2]) == rebuilt.recipes_with_all(pantry[:2])
+
+    # Updates leave the index they start from alone
+    fresh = make_index(recipes=300, ingredients=20)
+    for attribute in ["recipe_names", "recipe_ids", "postings", "bitsets", "size_bitsets"]:
+        assert getattr(original, attribute) == getattr(fresh, attribute), attribute
@@ -0,0 +1,93 @@
+import random
+import time
+
+import pytest
+
+from recipeapp.db.sqlite_helper.IngredientResolver import (
+    IngredientResolver,
+    bounded_levenshtein,
+)
+
+VOCABULARY = ["onion", "red onion", "courgette", "aubergine", "egg", "penne"]
+
+# Lines per second resolve_phrase must keep up with on misspelt lines,
+# well under what it manages but above the few hundred of a full trigram
+# count per window
+MIN_LINES_PER_SEC = 1500
+
+
+def test_bounded_levenshtein():
+    assert bounded_levenshtein("courgette", "courgete", 2) == 1
+    assert bounded_levenshtein("kitten", "sitting", 3) == 3
+    assert bounded_levenshtein("kitten", "sitting", 2) == 3
+    assert bounded_levenshtein("egg", "aubergine", 2) == 3
+
+
+def test_resolve():
+    resolver = IngredientResolver(VOCABULARY)
+
+    assert resolver.resolve("Onion") == "onion"
+    assert resolver.resolve("onions") == "onion"
+    assert resolver.resolve("corgette") == "courgette"
+    assert resolver.resolve("aubergines.") == "aubergine"
+    assert resolver.resolve("eggs") == "egg"
+    assert resolver.resolve("eg") is None
+    assert resolver.resolve("chocolate") is None
+    assert resolver.resolve("") is None
+
+
+def test_resolve_phrase():
+    resolver = IngredientResolver(VOCABULARY)
+
+    assert resolver.resolve_phrase("finely chopped red onions") == "red onion"
+    assert resolver.resolve_phrase("1 large courgette, sliced") == "courgette"
+    assert resolver.resolve_phrase("a pinch of salt") is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2 tbsp olive oil", "olive_oil"),
+    ("1 package cream cheese", "cream_cheese"),
+    ("1 (14 oz) can coconut milk", "coconut_milk"),
+    ("3 cloves garlic", "garlic"),
+    ("2 garlic cloves, crushed", "garlic"),
+    ("1 tsp ground cloves", "cloves"),
+    ("salt and freshly ground black pepper", "black_pepper"),
+    ("finely chopped red onions", "red_onion"),
+    ("1 cup self raising flour", "self-raising_flour"),
+    ("2 eggs", "egg"),
+])
+def test_resolve_phrase_bundled_vocabulary(bundled_resolver, text, expected):
+    assert bundled_resolver.resolve_phrase(text) == expected
+
+
+def test_resolve_returns_stored_names():
+    resolver = IngredientResolver(["olive_oil", "Cream_Cheese", "egg"])
+
+    assert resolver.resolve("olive oil") == "olive_oil"
+    assert resolver.resolve("olive oils") == "olive_oil"
+    assert resolver.resolve("cream cheese") == "Cream_Cheese"
+    assert resolver.resolve_phrase("soft cream cheese") == "Cream_Cheese"
+
+
+def test_resolve_phrase_throughput(bundled_resolver, record_property):
+    rng = random.Random(0)
+    vocabulary = [x for x in bundled_resolver.names.values() if len(x) >= 6]
+
+    lines, expected = [], []
+    for i in range(2000):
+        name = rng.choice(vocabulary).replace("_", " ")
+        position = rng.randrange(len(name))
+        typo = name[:position] + rng.choice("aeiou") + name[position + 1:]
+        lines.append("{0} cups finely chopped {1}, divided {2}".format(i % 9 + 1, typo, i))
+        expected.append(name)
+
+    # A new resolver, so that nothing is cached
+    resolver = IngredientResolver(bundled_resolver.names.values())
+    start = time.perf_counter()
+    results = [resolver.resolve_phrase(x) for x in lines]
+    lines_per_sec = len(lines) / (time.perf_counter() - start)
+    record_property("resolve_phrase lines/sec", round(lines_per_sec))
+
+    found = sum(x is not None and x.replace("_", " ") == y for x, y in zip(results, expected))
+    assert found >= 0.9 * len(lines)
+    assert lines_per_sec >= MIN_LINES_PER_SEC
@@ -0,0 +1,184 @@
+"""
+Checks that every SQLiteHelper query is served by an index.
+
+Each helper method is run against a synthetic database big enough for a
+full table scan to stand out. Every statement it executes is captured with
+a trace callback, checked with ``EXPLAIN QUERY PLAN`` and timed in virtual
+machine steps with a progress handler. The step counts are recorded as
+test properties, so they show up in the JUnit XML report.
+"""
+
+import random
+import re
+
+import pytest
+
+from recipeapp.db.sqlite_helper.SQLiteHelper import SQLiteHelper
+
+RECIPES = 5000
+INGREDIENTS = 500
+INGREDIENTS_PER_RECIPE = 8
+
+# Tables growing with the recipe collection. The ingredient vocabulary stays
+# small and substring searches on it scan by design.
+LARGE_TABLES = {"recipe", "recipe_ingredient", "recipe_instructions"}
+
+# Most steps a statement served by an index may take. A scan of
+# recipe_ingredient takes over a hundred thousand.
+STEP_BUDGET = 1000
+
+SQL_KEYWORDS = {"on", "where", "join", "order", "group", "limit", "left", "inner"}
+
+
+def recipe_name(i):
+
+    return "recipe {0:05d}".format(i)
+
+
+@pytest.fixture(scope="module")
+def large_db_path(tmp_path_factory):
+    """
+    Path of a recipe database with thousands of recipes.
+    """
+    db_path = str(tmp_path_factory.mktemp("query_plans") / "recipe.db")
+    rng = random.Random(0)
+
+    helper = SQLiteHelper(db_path)
+    helper.conn.executemany(
+        "INSERT INTO ingredient (name) VALUES (?)",
+        [("ingredient {0}".format(i),) for i in range(INGREDIENTS)]
+    )
+    helper.conn.commit()
+
+    helper.add_recipes([
+        {
+            "name": recipe_name(i),
+            "ingredients": [
+                {"name": "ingredient {0}".format(x), "quantity": 2, "unit": "oz"}
+                for x in rng.sample(range(INGREDIENTS), INGREDIENTS_PER_RECIPE)
+            ],
+            "instructions": "Mix well." if i % 2 else None,
+        }
+        for i in range(RECIPES)
+    ])
+    helper.conn.execute("ANALYZE")
+    helper.conn.commit()
+    helper.conn.close()
+
+    return db_path
+
+
+def trace_statements(conn, call):
+    """
+    Run ``call`` and return ``[sql, steps]`` for every statement it ran.
+    """
+    statements = []
+
+    def trace(sql):
+        statements.append([sql, 0])
+
+    def progress():
+        if statements:
+            statements[-1][1] += 1
+        return 0
+
+    conn.set_trace_callback(trace)
+    conn.set_progress_handler(progress, 1)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+        conn.set_progress_handler(None, 1)
+
+    return [
+        x for x in statements
+        if x[0].lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+    ]
+
+
+def scanned_tables(conn, sql):
+    """
+    Returns the tables ``sql`` reads in full, aliases resolved.
+    """
+    aliases = {}
+    for table, alias in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.I):
+        aliases[table] = table
+        if alias and alias.lower() not in SQL_KEYWORDS:
+            aliases[alias] = table
+
+    scanned = set()
+    for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+        # A skip-scan, "ANY(column)", seeks once per distinct value of the
+        # skipped column, as bad as a scan on a large table
+        match = re.match(r"SCAN (\w+)|SEARCH (\w+) .*\bANY\(", row[3])
+        if match:
+            table = match.group(1) or match.group(2)
+            scanned.add(aliases.get(table, table))
+
+    return scanned
+
+
+# (helper method, call, large tables it may scan, step budget). Reading the
+# whole ingredient vocabulary, listing every recipe and building the
+# in-memory ingredient index are unbounded on purpose.
+QUERIES = [
+    ("get_ingredient_id", lambda h: h.get_ingredient_id("ingredient 7"), set(), STEP_BUDGET),
+    ("get_ingredient", lambda h: h.get_ingredient(7), set(), STEP_BUDGET),
+    ("get_all_ingredients", lambda h: h.get_all_ingredients(), set(), None),
+    ("search_ingredients", lambda h: h.search_ingredients("ent 4", 20), set(), None),
+    ("get_recipe_id", lambda h: h.get_recipe_id(recipe_name(42)), set(), STEP_BUDGET),
+    # The first page walks the name index in order and stops after a page
+    ("get_recipes_page", lambda h: h.get_recipes_page(), {"recipe"}, STEP_BUDGET),
+    ("get_recipes_page after",
+     lambda h: h.get_recipes_page(recipe_name(2500), "recipe 0"), set(), STEP_BUDGET),
+    ("get_recipe_ingredients",
+     lambda h: h.get_recipe_ingredients(recipe_name(42)), set(), STEP_BUDGET),
+    ("get_cart_rows",
+     lambda h: h.get_cart_rows([recipe_name(x) for x in (1, 2, 3, 1)]), set(), STEP_BUDGET),
+    ("get_recipe_ids",
+     lambda h: h.get_recipe_ids([recipe_name(x) for x in (1, 2, 3, 1)]), set(), STEP_BUDGET),
+    # Grouping and ranking take a couple of hundred steps per cart row
+    ("compute_cart", lambda h: h.compute_cart([2, 3, 4, 2]), set(), 10 * STEP_BUDGET),
+    ("get_recipe_instructions",
+     lambda h: h.get_recipe_instructions(recipe_name(43)), set(), STEP_BUDGET),
+    ("set_recipe_instructions",
+     lambda h: h.set_recipe_instructions(recipe_name(44), "Stir."), set(), STEP_BUDGET),
+    # Reads the vocabulary once, to compare names normalized
+    ("get_ingredient_ids",
+     lambda h: h.get_ingredient_ids(["ingredient 1", "ingredient 2"]), set(), None),
+    ("add_recipe", lambda h: h.add_recipe("new recipe", [
+        {"name": "ingredient 1", "quantity": 1, "unit": "cup"},
+    ], "Serve."), set(), STEP_BUDGET),
+    ("add_recipes", lambda h: h.add_recipes([{"name": "newer recipe", "ingredients": [
+        {"name": "ingredient 2", "quantity": 1, "unit": "cup"},
+    ]}]), set(), None),
+    ("delete_recipe", lambda h: h.delete_recipe(recipe_name(45)), set(), STEP_BUDGET),
+    ("get_recipes", lambda h: h.get_recipes(), {"recipe"}, None),
+    ("get_recipes_with_ingredients",
+     lambda h: h.get_recipes_with_ingredients(["ingredient 1"]),
+     {"recipe", "recipe_ingredient"}, None),
+    ("rank_recipes_by_coverage",
+     lambda h: h.rank_recipes_by_coverage(["ingredient 1", "ingredient 2"], 10),
+     {"recipe", "recipe_ingredient"}, None),
+]
+
+
+@pytest.mark.parametrize(
+    "name, call, allowed_scans, step_budget", QUERIES, ids=[x[0] for x in QUERIES]
+)
+def test_query_plan(large_db_path, record_property, name, call, allowed_scans, step_budget):
+    helper = SQLiteHelper(large_db_path)
+
+    statements = trace_statements(helper.conn, lambda: call(helper))
+    assert statements
+
+    for i, (sql, steps) in enumerate(statements):
+        record_property("{0} statement {1} steps".format(name, i), steps)
+
+        scans = scanned_tables(helper.conn, sql) & LARGE_TABLES - allowed_scans
+        assert not scans, "{0} scans {1}:\n{2}".format(name, ", ".join(sorted(scans)), sql)
+
+        if step_budget is not None:
+            assert steps <= step_budget, "{0} took {1} steps:\n{2}".format(name, steps, sql)
+
+    helper.conn.close()
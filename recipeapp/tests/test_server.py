@@ -0,0 +1,142 @@
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+import pytest
+
+from recipeapp.server import RecipeServer
+
+
+@pytest.fixture
+def server(db_path):
+    server = RecipeServer(("127.0.0.1", 0), db_path, readers=2)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+
+    yield "http://127.0.0.1:%d" % server.server_address[1]
+
+    server.shutdown()
+    server.server_close()
+
+
+def request(url, method="GET", body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    try:
+        with urlopen(Request(url, data=data, method=method)) as response:
+            return response.status, json.load(response)
+    except HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_recipes(server):
+    assert request(f"{server}/recipes") == (200, {
+        "recipes": ["classic pasta", "omelette", "ratatouille"], "next": None
+    })
+    assert request(f"{server}/recipes?limit=2&prefix=") == (200, {
+        "recipes": ["classic pasta", "omelette"], "next": "omelette"
+    })
+    assert request(f"{server}/recipes?limit=2&after=omelette") == (200, {
+        "recipes": ["ratatouille"], "next": None
+    })
+
+    status, body = request(f"{server}/recipes/omelette")
+    assert status == 200
+    assert body["ingredients"] == [
+        {"name": "egg", "quantity": 3, "unit": ""},
+        {"name": "onion", "quantity": 1, "unit": ""},
+    ]
+
+    assert request(f"{server}/recipes/pizza")[0] == 404
+    assert request(f"{server}/unknown")[0] == 404
+
+
+def test_add_and_delete_recipe(server):
+    recipe = {
+        "name": "Frittata",
+        "ingredients": [{"name": "egg", "quantity": 6, "unit": ""}],
+        "instructions": "Bake for 20 minutes.",
+    }
+
+    assert request(f"{server}/recipes", "POST", recipe) == (201, {"name": "frittata"})
+    assert request(f"{server}/recipes", "POST", recipe)[0] == 409
+    assert request(f"{server}/pantry?ingredients=egg")[1]["recipes"][0] == {
+        "name": "frittata", "matched": 1, "total": 1
+    }
+
+    assert request(f"{server}/recipes/frittata/instructions") == (200, {
+        "name": "frittata", "instructions": "Bake for 20 minutes."
+    })
+    assert request(f"{server}/recipes/omelette/instructions") == (200, {
+        "name": "omelette", "instructions": None
+    })
+
+    assert request(f"{server}/recipes/frittata", "DELETE")[0] == 200
+    assert request(f"{server}/recipes/frittata")[0] == 404
+
+
+def test_add_recipe_quoted_names(server):
+    recipe = {"ingredients": [{"name": "egg", "quantity": 2, "unit": ""}]}
+    eggs = f"{server}/recipes/" + quote("mom's eggs")
+
+    assert request(f"{server}/recipes", "POST", {**recipe, "name": "mom's eggs"}) == (
+        201, {"name": "mom's eggs"}
+    )
+    assert request(eggs)[1]["ingredients"] == recipe["ingredients"]
+
+    # Names are data, never SQL
+    assert request(f"{server}/recipes", "POST", {**recipe, "name": "x'), ('injected"})[0] == 201
+    assert request(f"{server}/recipes/injected")[0] == 404
+    assert request(
+        f"{server}/recipes/" + quote("x'), ('injected")
+    )[1]["ingredients"] == recipe["ingredients"]
+
+    assert request(eggs, "DELETE")[0] == 200
+    assert request(eggs)[0] == 404
+
+
+@pytest.mark.parametrize("body", [
+    [],
+    {"name": "frittata"},
+    {"name": 12, "ingredients": [{"name": "egg", "quantity": 6, "unit": ""}]},
+    {"name": "frittata", "ingredients": {"name": "egg"}},
+    {"name": "frittata", "ingredients": [{"quantity": 6, "unit": ""}]},
+    {"name": "frittata", "ingredients": [{"name": "egg", "unit": ""}]},
+    {"name": "frittata", "ingredients": [{"name": "egg", "quantity": "six", "unit": ""}]},
+    {"name": "frittata", "ingredients": [{"name": "egg", "quantity": 6}]},
+    {"name": "frittata", "ingredients": [{"name": "egg", "quantity": 200, "unit": "g"}]},
+    {"name": "frittata", "ingredients": [{"name": "egg", "quantity": 6, "unit": ""}],
+     "instructions": ["Bake."]},
+])
+def test_add_recipe_invalid(server, body):
+    assert request(f"{server}/recipes", "POST", body)[0] == 400
+    assert request(f"{server}/recipes/frittata")[0] == 404
+
+
+@pytest.mark.parametrize("path", [
+    "recipes?limit=abc", "recipes?limit=0", "ingredients?q=on&limit=-1", "pantry?limit=x",
+])
+def test_invalid_limit(server, path):
+    assert request(f"{server}/{path}")[0] == 400
+
+
+def test_search_ingredients(server):
+    assert request(f"{server}/ingredients?q=on") == (200, {
+        "ingredients": ["onion"]
+    })
+
+
+def test_cart(server):
+    status, body = request(f"{server}/cart", "POST", {
+        "recipes": ["omelette", "ratatouille"]
+    })
+
+    assert status == 200
+    assert body["cart"] == [
+        {"ingredient": "aubergine", "quantity": "9.00 oz"},
+        {"ingredient": "courgette", "quantity": "9.00 oz"},
+        {"ingredient": "egg", "quantity": "3 items"},
+        {"ingredient": "onion", "quantity": "2 items"},
+    ]
+    assert request(f"{server}/cart", "POST", {"recipes": "omelette"})[0] == 400
@@ -0,0 +1,289 @@
+import sqlite3
+from decimal import Decimal
+
+import pytest
+
+from recipeapp.db.sqlite_helper.IngredientIndex import IngredientIndex
+from recipeapp.db.sqlite_helper.SQLiteHelper import SQLiteHelper
+
+
+def test_get_recipes_with_ingredients(helper):
+    assert helper.get_recipes_with_ingredients(["courgette", "onion"]) == [
+        "classic pasta", "ratatouille"
+    ]
+    assert helper.get_recipes_with_ingredients(["Egg "]) == ["omelette"]
+    assert helper.get_recipes_with_ingredients(["egg", "unknown"]) == []
+
+
+def test_ingredient_names_normalized(helper):
+    helper.conn.execute("INSERT INTO ingredient (name) VALUES ('olive_oil')")
+    helper.conn.commit()
+    helper.add_recipe("aglio e olio", [
+        {"name": "olive_oil", "quantity": 2, "unit": "tbs"},
+        {"name": "onion", "quantity": 1, "unit": ""},
+    ])
+
+    assert helper.get_recipes_with_ingredients(["Olive oil", "onion"]) == ["aglio e olio"]
+    assert helper.get_recipes_with_ingredients(["olive  oil", ""]) == []
+    assert helper.rank_recipes_by_coverage(["olive oil", "onion"], limit=1) == [
+        ("aglio e olio", 2, 2)
+    ]
+
+
+def test_rank_recipes_by_coverage(helper):
+    ranking = helper.rank_recipes_by_coverage(["courgette", "onion", "aubergine"])
+
+    assert ranking == [
+        ("ratatouille", 3, 3),
+        ("classic pasta", 2, 4),
+        ("omelette", 1, 2),
+    ]
+    assert helper.rank_recipes_by_coverage(["onion"], limit=1) == [
+        ("omelette", 1, 2)
+    ]
+    assert helper.rank_recipes_by_coverage(
+        ["courgette", "onion", "aubergine"], limit=2, prefix="c"
+    ) == [
+        ("classic pasta", 2, 4)
+    ]
+
+
+def test_ingredient_index_follows_changes(helper):
+    assert helper.get_recipes_with_ingredients(["egg"]) == ["omelette"]
+
+    helper.delete_recipe("omelette")
+    helper.add_recipe("frittata", [
+        {"name": "egg", "quantity": 6, "unit": ""},
+        {"name": "courgette", "quantity": 4, "unit": "oz"},
+    ])
+
+    assert helper.get_recipes_with_ingredients(["egg"]) == ["frittata"]
+
+
+def test_ingredient_index_updated_in_place(db_path, helper, monkeypatch):
+    helper.get_ingredient_index()
+
+    builds = []
+    monkeypatch.setattr(
+        "recipeapp.db.sqlite_helper.SQLiteHelper.IngredientIndex",
+        lambda *args: builds.append(1) or IngredientIndex(*args)
+    )
+
+    helper.delete_recipe("omelette")
+    helper.add_recipe("frittata", [{"name": "egg", "quantity": 6, "unit": ""}])
+    helper.add_recipes([{"name": "egg fried rice", "ingredients": [
+        {"name": "egg", "quantity": 2, "unit": ""}, {"name": "onion", "quantity": 1, "unit": ""}
+    ]}])
+    assert not helper.add_recipe("frittata", [])
+
+    assert helper.get_recipes_with_ingredients(["egg"]) == ["egg fried rice", "frittata"]
+    assert helper.rank_recipes_by_coverage(["egg"], limit=2) == [
+        ("frittata", 1, 1), ("egg fried rice", 1, 2)
+    ]
+    assert builds == []
+
+    # Changes through another connection still rebuild it
+    other = SQLiteHelper(db_path)
+    other.delete_recipe("frittata")
+    assert helper.get_recipes_with_ingredients(["egg"]) == ["egg fried rice"]
+    assert builds == [1]
+
+
+def test_add_recipe_rejects_unknown_ingredients(helper):
+    assert not helper.add_recipe("mystery", [
+        {"name": "egg", "quantity": 2, "unit": ""},
+        {"name": "unobtainium", "quantity": 1, "unit": "oz"},
+    ])
+    assert helper.get_recipe_id("mystery") is None
+
+
+def test_add_recipe_rejects_unknown_units(helper):
+    assert not helper.add_recipe("mystery", [
+        {"name": "egg", "quantity": 2, "unit": ""},
+        {"name": "onion", "quantity": 1, "unit": "furlong"},
+    ])
+    assert helper.get_recipe_id("mystery") is None
+
+    assert helper.add_recipes([
+        {"name": "mystery", "ingredients": [
+            {"name": "onion", "quantity": 1, "unit": "furlong"}
+        ]},
+        {"name": "fried egg", "ingredients": [
+            {"name": "egg", "quantity": 1, "unit": ""}
+        ]},
+    ]) == 1
+    assert helper.get_recipe_id("mystery") is None
+    assert helper.get_recipe_id("fried egg") is not None
+
+
+def test_get_cart_rows(helper):
+    rows = helper.get_cart_rows(["omelette", "ratatouille", "omelette"])
+
+    assert [(name, quantity, unit) for _, name, quantity, unit in rows] == [
+        ("egg", 3, ""), ("onion", 1, ""),
+        ("aubergine", 9, "oz"), ("courgette", 9, "oz"), ("onion", 1, ""),
+        ("egg", 3, ""), ("onion", 1, ""),
+    ]
+
+
+def test_read_only_helper(db_path, helper):
+    reader = SQLiteHelper(db_path, read_only=True)
+
+    assert reader.get_recipes_with_ingredients(["egg"]) == ["omelette"]
+    assert reader.search_ingredients("GINE") == ["aubergine"]
+
+    helper.delete_recipe("omelette")
+
+    assert reader.get_recipes_with_ingredients(["egg"]) == []
+    with pytest.raises(sqlite3.OperationalError):
+        reader.add_recipe("boiled egg", [{"name": "egg", "quantity": 1, "unit": ""}])
+
+
+def test_get_recipes_page(helper):
+    for name in ["Pizza", "pasta e fagioli", "PANZANELLA", "pesto pasta"]:
+        helper.conn.execute("INSERT INTO recipe (name) VALUES (?)", (name,))
+
+    assert helper.get_recipes_page(limit=3) == [
+        "classic pasta", "omelette", "PANZANELLA"
+    ]
+    assert helper.get_recipes_page(after="PANZANELLA", limit=3) == [
+        "pasta e fagioli", "pesto pasta", "Pizza"
+    ]
+    assert helper.get_recipes_page(after="Pizza") == ["ratatouille"]
+    assert helper.get_recipes_page(prefix="pA") == [
+        "PANZANELLA", "pasta e fagioli"
+    ]
+    assert helper.get_recipes_page(prefix="p", after="pesto pasta") == ["Pizza"]
+    assert helper.get_recipes_page(prefix="x") == []
+
+
+def test_recipe_instructions(helper):
+    instructions = "Beat the eggs. Fry the onion, add the eggs and fold. " * 2000
+
+    assert helper.get_recipe_instructions("omelette") is None
+    assert helper.set_recipe_instructions("omelette", instructions)
+    assert not helper.set_recipe_instructions("pizza", instructions)
+
+    assert helper.get_recipe_instructions("omelette") == instructions
+    chunks = list(helper.iter_recipe_instructions("omelette", chunk_size=64))
+    assert len(chunks) > 2
+    assert "".join(chunks) == instructions
+
+    stored = helper.conn.execute("SELECT data FROM recipe_instructions").fetchone()[0]
+    assert len(stored) < len(instructions) / 10
+
+    helper.delete_recipe("omelette")
+    assert helper.conn.execute("SELECT * FROM recipe_instructions").fetchall() == []
+
+
+def test_add_recipe_with_instructions(helper):
+    assert helper.add_recipe(
+        "boiled egg", [{"name": "egg", "quantity": 1, "unit": ""}], "Boil for 7 minutes."
+    )
+
+    assert helper.get_recipe_instructions("boiled egg") == "Boil for 7 minutes."
+    assert helper.set_recipe_instructions("boiled egg", "")
+    assert helper.get_recipe_instructions("boiled egg") is None
+
+
+def test_canonical_units(helper):
+    helper.add_recipes([{"name": "pancakes", "ingredients": [
+        {"name": "egg", "quantity": 2, "unit": ""},
+        {"name": "onion", "quantity": 0.5, "unit": "cup"},
+    ]}])
+
+    rows = helper.conn.execute("""
+        SELECT r.name, i.name, ri.base_quantity, ri.dimension
+        FROM recipe_ingredient ri
+        JOIN recipe r ON r.id = ri.recipe
+        JOIN ingredient i ON i.id = ri.ingredient
+        WHERE r.name IN ('classic pasta', 'pancakes')
+        ORDER BY ri.rowid
+    """).fetchall()
+
+    assert rows == [
+        ("classic pasta", "penne", pytest.approx(453.59237), "mass"),
+        ("classic pasta", "sauce", pytest.approx(453.59237), "mass"),
+        ("classic pasta", "courgette", pytest.approx(255.145708), "mass"),
+        ("classic pasta", "onion", pytest.approx(113.398093), "mass"),
+        ("pancakes", "egg", 2, "count"),
+        ("pancakes", "onion", pytest.approx(118.29411825), "volume"),
+    ]
+
+
+def test_migrate_units(tmp_path):
+    db_path = str(tmp_path / "old.db")
+
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE recipe_ingredient
+             (recipe INTEGER, ingredient INTEGER, quantity FLOAT, unit TEXT);
+        INSERT INTO recipe_ingredient VALUES (1, 1, 2, 'lb'), (1, 2, 3, ''),
+             (2, 1, 1, 'tbs'), (2, 3, 1, NULL), (2, 4, 1, 'pinch');
+    """)
+    conn.close()
+
+    helper = SQLiteHelper(db_path)
+    rows = helper.conn.execute(
+        "SELECT base_quantity, dimension FROM recipe_ingredient ORDER BY rowid"
+    ).fetchall()
+
+    assert rows == [
+        (pytest.approx(907.18474), "mass"),
+        (3, "count"),
+        (pytest.approx(14.78676478125), "volume"),
+        (1, "count"),
+        (None, None),
+    ]
+    assert helper.migrate_units() == 0
+
+
+def test_recipe_names_with_quotes(helper):
+    assert helper.add_recipe("mom's pie", [{"name": "egg", "quantity": 2, "unit": ""}])
+    assert helper.get_recipe_ingredients("mom's pie") == [
+        {"name": "egg", "quantity": 2, "unit": ""}
+    ]
+
+    assert helper.delete_recipe("mom's pie")
+    assert helper.get_recipe_id("mom's pie") is None
+
+
+def test_add_recipe_decimal_quantity(helper):
+    # toga.NumberInput values are Decimals
+    assert helper.add_recipe("fried egg", [
+        {"name": "egg", "quantity": Decimal("1.5"), "unit": "oz"}
+    ])
+
+    assert helper.get_recipe_ingredients("fried egg") == [
+        {"name": "egg", "quantity": 1.5, "unit": "oz"}
+    ]
+
+
+def test_get_recipe_ids(helper):
+    pasta, omelette = helper.get_recipe_id("classic pasta"), helper.get_recipe_id("omelette")
+
+    assert helper.get_recipe_ids(["omelette", "pizza", "classic pasta", "omelette"]) == [
+        omelette, pasta, omelette
+    ]
+    assert helper.get_recipe_ids([]) == []
+
+
+def test_open_without_writing(db_path):
+    other = sqlite3.connect(db_path)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        # Opening an up to date database needs no write lock
+        helper = SQLiteHelper(db_path)
+        assert helper.conn.total_changes == 0
+        helper.conn.close()
+    finally:
+        other.rollback()
+        other.close()
+
+    helper = SQLiteHelper(db_path)
+    helper.conn.execute("UPDATE unit SET factor = 1 WHERE name = 'lb'")
+    helper.conn.commit()
+    helper.conn.close()
+
+    helper = SQLiteHelper(db_path)
+    assert helper.conn.execute("SELECT factor FROM unit WHERE name = 'lb'").fetchone()[0] == 453.59237
@@ -0,0 +1,36 @@
+from recipeapp.db.sqlite_helper.IngredientIndex import IngredientIndex
+from recipeapp.db.sqlite_helper.SQLiteHelper import SQLiteHelper
+from recipeapp.db.sqlite_helper.SQLiteHelperPool import SQLiteHelperPool
+
+
+def test_shared_ingredient_index(db_path, monkeypatch):
+    builds = []
+    monkeypatch.setattr(
+        "recipeapp.db.sqlite_helper.SQLiteHelper.IngredientIndex",
+        lambda *args: builds.append(1) or IngredientIndex(*args)
+    )
+    pool = SQLiteHelperPool(db_path, readers=2)
+
+    def rank():
+        index = pool.get_ingredient_index()
+        with pool.reader() as helper:
+            return [x[0] for x in helper.rank_recipes_by_coverage(["egg"], 10, index=index)]
+
+    assert builds == [1]
+    assert rank() == ["omelette"]
+    assert pool.get_ingredient_index() is pool.get_ingredient_index()
+
+    with pool.writer() as helper:
+        helper.add_recipe("frittata", [{"name": "egg", "quantity": 6, "unit": ""}])
+    assert rank() == ["frittata", "omelette"]
+
+    # Writes through the pool update the one index, the readers build none
+    assert builds == [1]
+
+    other = SQLiteHelper(db_path)
+    other.delete_recipe("frittata")
+    other.conn.close()
+    assert rank() == ["omelette"]
+    assert builds == [1, 1]
+
+    pool.close()
@@ -0,0 +1,109 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Modules that are slow to import and must only load when their feature
+# is first used.
+DEFERRED_MODULES = {
+    "pint",
+    "numpy",
+    "googleapiclient",
+    "google_auth_oauthlib",
+    "google.oauth2",
+    "google.auth",
+}
+
+# Every module importing recipeapp.app loads on top of toga's own. Adding
+# to startup should be a deliberate change to this list.
+APP_IMPORTS = {
+    "_json",
+    "_sqlite3",
+    "json",
+    "json.decoder",
+    "json.encoder",
+    "json.scanner",
+    "recipeapp",
+    "recipeapp.app",
+    "recipeapp.cart",
+    "recipeapp.db",
+    "recipeapp.db.sqlite_helper",
+    "recipeapp.db.sqlite_helper.IngredientIndex",
+    "recipeapp.db.sqlite_helper.IngredientResolver",
+    "recipeapp.db.sqlite_helper.SQLiteHelper",
+    "recipeapp.units",
+    "sqlite3",
+    "sqlite3.dbapi2",
+}
+
+
+def import_times(module: str) -> dict:
+    """
+    Import a module in a fresh interpreter with ``-X importtime``.
+
+    :param module: Module to import
+    :return: Cumulative import time in microseconds of every module the
+        import loaded, in load order
+    """
+    result = subprocess.run(
+        [sys.executable, "-S", "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and not line.endswith("imported package"):
+            _, cumulative, name = line[len("import time:"):].split("|")
+            times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def imported_modules(module: str) -> list:
+
+    return list(import_times(module))
+
+
+def deferred(modules: list) -> set:
+
+    return {
+        name for name in modules
+        if any(name == x or name.startswith(x + ".") for x in DEFERRED_MODULES)
+    }
+
+
+@pytest.mark.parametrize("module", [
+    "recipeapp.cart",
+    "recipeapp.units",
+    "recipeapp.db.sqlite_helper.SQLiteHelper",
+    "recipeapp.gdrive.GoogleDriveHelper",
+])
+def test_library_imports_only_stdlib(module):
+    modules = imported_modules(module)
+
+    assert not deferred(modules)
+    assert {
+        name.split(".")[0] for name in modules
+    } <= set(sys.stdlib_module_names) | {"recipeapp"}
+
+
+def test_app_defers_heavy_imports():
+    pytest.importorskip("toga")
+
+    assert not deferred(imported_modules("recipeapp.app"))
+
+
+def test_app_import_set(record_property):
+    pytest.importorskip("toga")
+
+    toga_modules = import_times("toga")
+    app_modules = import_times("recipeapp.app")
+    record_property("recipeapp.app import us", app_modules["recipeapp.app"])
+    record_property("toga import us", toga_modules["toga"])
+
+    added = [x for x in app_modules if x not in toga_modules and x not in APP_IMPORTS]
+    assert not added, "recipeapp.app now also imports: {0}".format(", ".join(added))
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+HARNESS = Path(__file__).parent.parent / "benchmarks" / "ui_latency.py"
+
+# Far above the handlers' latency on a small database; only meant to catch
+# a handler gone badly wrong
+MAX_P99_MS = 2000
+
+
+def test_ui_latency_harness():
+    pytest.importorskip("toga_dummy")
+
+    result = subprocess.run(
+        [sys.executable, str(HARNESS), "--recipes", "500", "--ingredients", "100",
+         "--rounds", "10", "--max-p99", str(MAX_P99_MS)],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+
+    assert result.returncode == 0, result.stderr
+    for handler in ["update_recipe_selection", "add_recipe_to_table", "populate_cart",
+                    "save_selections", "show_add_recipe_box", "show_main_box",
+                    "update_ingredients_list", "save_recipe"]:
+        assert handler in result.stdout